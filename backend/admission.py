@@ -0,0 +1,163 @@
+"""Admission control and load shedding for the expensive endpoints.
+
+Each expensive route (/ask, /ask/batch, /agent, /upload-document) gets a
+concurrency limit and a bounded wait queue. When the queue is full the
+request is rejected immediately with 429; when it waits longer than the
+queue timeout it gets 503. Both carry a Retry-After estimated from recent
+service times. Cheap routes (/healthz, /health/{id}, /metrics) are never
+queued, so they stay fast during a burst.
+
+Limits come from env vars, e.g. ADMISSION_ASK_CONCURRENCY=8,
+ADMISSION_ASK_QUEUE=32, ADMISSION_ASK_TIMEOUT=10.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from backend.metrics import ADMISSION_INFLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED
+
+# Smoothing factor for the running mean of service time used for Retry-After
+SERVICE_TIME_ALPHA = 0.2
+
+
+@dataclass
+class EndpointLimit:
+    concurrency: int
+    max_queue: int
+    queue_timeout: float
+
+    @classmethod
+    def from_env(cls, name: str, concurrency: int, max_queue: int, queue_timeout: float) -> "EndpointLimit":
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(
+            concurrency=int(os.getenv(prefix + "CONCURRENCY", concurrency)),
+            max_queue=int(os.getenv(prefix + "QUEUE", max_queue)),
+            queue_timeout=float(os.getenv(prefix + "TIMEOUT", queue_timeout)),
+        )
+
+
+# (method, path) -> endpoint name
+ROUTES: Dict[tuple, str] = {
+    ("POST", "/ask"): "ask",
+    ("POST", "/ask/batch"): "ask_batch",
+    ("POST", "/agent"): "agent",
+    ("POST", "/upload-document"): "upload",
+}
+
+
+def default_limits() -> Dict[str, EndpointLimit]:
+    return {
+        "ask": EndpointLimit.from_env("ask", 8, 32, 10.0),
+        "ask_batch": EndpointLimit.from_env("ask_batch", 2, 4, 30.0),
+        "agent": EndpointLimit.from_env("agent", 4, 16, 30.0),
+        "upload": EndpointLimit.from_env("upload", 2, 4, 60.0),
+    }
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, retry_after: int) -> None:
+        super().__init__(f"rejected with {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+@dataclass
+class _EndpointState:
+    limit: EndpointLimit
+    inflight: int = 0
+    waiting: int = 0
+    service_time: float = 1.0
+    _sem: Optional[asyncio.Semaphore] = field(default=None, repr=False)
+
+    @property
+    def sem(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.limit.concurrency)
+        return self._sem
+
+    def retry_after(self) -> int:
+        backlog = (self.waiting + 1) / max(1, self.limit.concurrency)
+        return max(1, math.ceil(backlog * self.service_time))
+
+
+class AdmissionController:
+    def __init__(self, limits: Optional[Dict[str, EndpointLimit]] = None) -> None:
+        self._state = {name: _EndpointState(limit) for name, limit in (limits or default_limits()).items()}
+
+    def endpoint_for(self, method: str, path: str) -> Optional[str]:
+        name = ROUTES.get((method, path.rstrip("/") or "/"))
+        return name if name in self._state else None
+
+    async def acquire(self, name: str) -> None:
+        st = self._state[name]
+        if st.sem.locked() and st.waiting >= st.limit.max_queue:
+            ADMISSION_REJECTED.labels(endpoint=name, status="429").inc()
+            raise Rejected(429, st.retry_after())
+        st.waiting += 1
+        ADMISSION_QUEUE_DEPTH.labels(endpoint=name).set(st.waiting)
+        try:
+            await asyncio.wait_for(st.sem.acquire(), timeout=st.limit.queue_timeout)
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTED.labels(endpoint=name, status="503").inc()
+            raise Rejected(503, st.retry_after()) from None
+        finally:
+            st.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.labels(endpoint=name).set(st.waiting)
+        st.inflight += 1
+        ADMISSION_INFLIGHT.labels(endpoint=name).set(st.inflight)
+
+    def release(self, name: str, elapsed: float) -> None:
+        st = self._state[name]
+        st.inflight -= 1
+        st.service_time += SERVICE_TIME_ALPHA * (elapsed - st.service_time)
+        ADMISSION_INFLIGHT.labels(endpoint=name).set(st.inflight)
+        st.sem.release()
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an `AdmissionController` to matching requests."""
+
+    def __init__(self, app: Callable[..., Awaitable[Any]], controller: AdmissionController) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        name = None
+        if scope["type"] == "http":
+            name = self.controller.endpoint_for(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(name)
+        except Rejected as e:
+            await _send_rejection(send, e)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name, time.perf_counter() - started)
+
+
+async def _send_rejection(send: Callable, e: Rejected) -> None:
+    detail = "Too many requests queued" if e.status == 429 else "Timed out waiting for capacity"
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": e.status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(e.retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
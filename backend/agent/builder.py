@@ -1,15 +1,15 @@
 """Agent builder for Smart Building Assistant."""
 from __future__ import annotations
 
-from langchain_openai import ChatOpenAI
-from langchain.agents import create_openai_functions_agent, AgentExecutor
+from langchain.agents import create_openai_tools_agent, AgentExecutor
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 from backend.agent.tools import TOOLS
+from backend.llm_factory import DEFAULT_MODEL, get_chat_model
 
 
-def get_agent(model_name: str = "gpt-3.5-turbo", temperature: float = 0.2) -> AgentExecutor:
-    llm = ChatOpenAI(model_name=model_name, temperature=temperature)
+def get_agent(model_name: str = DEFAULT_MODEL, temperature: float = 0.2) -> AgentExecutor:
+    llm = get_chat_model(model_name, temperature)
 
     system_prompt = (
         "You are an expert Smart Building Operations Assistant. "
@@ -26,7 +26,9 @@ def get_agent(model_name: str = "gpt-3.5-turbo", temperature: float = 0.2) -> Ag
         ]
     )
 
-    agent = create_openai_functions_agent(llm, TOOLS, prompt)
+    # Tools agent uses parallel function calling: independent tool calls from one
+    # step are returned together and run concurrently by AgentExecutor.ainvoke
+    agent = create_openai_tools_agent(llm, TOOLS, prompt)
     # Allow up to 10 reasoning steps; when cap reached generate best final answer
     return AgentExecutor(
         agent=agent,
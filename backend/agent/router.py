@@ -0,0 +1,182 @@
+"""Deterministic fast path in front of the LangChain agent.
+
+Questions such as "Predict failure probability for HVAC-01" or "latest sensor
+readings for CHILLER-02" need exactly one tool call, yet the agent spends one
+or more LLM round-trips deciding that. `FastPathRouter` recognises them with
+an equipment-tag match, keyword patterns and a tiny Naive Bayes classifier,
+calls the tool directly and templates the reply. Anything ambiguous returns
+None and falls through to the agent.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.agent import tools
+from backend.rag.metadata import EQUIPMENT_TAG_RE, extract_equipment_tags
+
+PREDICT = "predict_failure"
+SENSORS = "sensor_live_data"
+OPEN = "open"
+
+# Seed utterances for the local classifier (equipment tags stripped)
+_SEEDS: Dict[str, List[str]] = {
+    PREDICT: [
+        "predict failure probability for",
+        "what is the failure probability of",
+        "failure risk for",
+        "how likely is it to fail",
+        "will it break down soon",
+        "health score of",
+        "predict the health of",
+        "chance of failure",
+        "risk of breakdown",
+        "is it at risk",
+    ],
+    SENSORS: [
+        "latest sensor readings for",
+        "current sensor data for",
+        "show live data for",
+        "what is the current temperature of",
+        "what is the vibration of",
+        "pressure reading for",
+        "get the latest readings",
+        "live telemetry for",
+        "current readings",
+        "show sensors",
+    ],
+    OPEN: [
+        "when was the last filter change for",
+        "how do i reset",
+        "why is it making noise",
+        "compare energy use of",
+        "what does the manual say about",
+        "summarize maintenance history",
+        "which floor had the highest occupancy",
+        "average kwh consumed between midnight and 2 am",
+        "explain the alarm",
+        "what should i do if",
+        "what is hvac",
+        "how many documents are ingested",
+    ],
+}
+
+# Cues that a question needs reasoning, retrieval, advice or several tools.
+# A tool reading alone cannot answer "what would cause ...", "should I ..."
+# or anything about work orders, so these always go to the agent.
+_OPEN_CUES = re.compile(
+    r"\b(why|how (do|to|should|can)|compare|explain|manual|document|history|between|average|last|when|and then|versus|vs"
+    r"|would|could|should|cause[sd]?|reasons?|recommend\w*|advi[cs]e|replace|repair|fix|work\s*orders?|given|if)\b",
+    re.IGNORECASE,
+)
+# What each tool returns; the question must ask for it explicitly. Qualifiers
+# such as "current" or "latest" are not enough ("current work orders").
+_INTENT_CUES = {
+    PREDICT: re.compile(r"\b(predict\w*|failure|fail\w*|risk|break\s*down|health)\b", re.IGNORECASE),
+    SENSORS: re.compile(r"\b(sensor\w*|reading\w*|telemetry|temperature|vibration|pressure|live\s+data)\b", re.IGNORECASE),
+}
+
+MIN_CONFIDENCE = 0.6
+# Smoothing factor for the running mean of full-agent latency
+LATENCY_EWMA_ALPHA = 0.1
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z]+", EQUIPMENT_TAG_RE.sub(" ", text).lower())
+
+
+class _NaiveBayes:
+    """Multinomial Naive Bayes over word unigrams with Laplace smoothing."""
+
+    def __init__(self, samples: Dict[str, Iterable[str]]) -> None:
+        self.word_counts: Dict[str, Counter] = {}
+        self.totals: Dict[str, int] = {}
+        self.priors: Dict[str, float] = {}
+        vocab = set()
+        n_docs = sum(len(list(v)) for v in samples.values())
+        for label, texts in samples.items():
+            texts = list(texts)
+            counter: Counter = Counter()
+            for t in texts:
+                counter.update(_tokens(t))
+            self.word_counts[label] = counter
+            self.totals[label] = sum(counter.values())
+            self.priors[label] = math.log(len(texts) / n_docs)
+            vocab.update(counter)
+        self.vocab_size = len(vocab)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Return (label, posterior probability)."""
+        words = _tokens(text)
+        scores = {}
+        for label, counter in self.word_counts.items():
+            denom = self.totals[label] + self.vocab_size
+            scores[label] = self.priors[label] + sum(math.log((counter[w] + 1) / denom) for w in words)
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1.0 / norm
+
+
+@dataclass
+class RouteResult:
+    intent: str
+    equipment_id: str
+    answer: str
+
+
+def _format_sensors(sensors: Dict[str, object]) -> str:
+    return ", ".join(f"{k} {v}" for k, v in sensors.items())
+
+
+class FastPathRouter:
+    def __init__(self, min_confidence: float = MIN_CONFIDENCE) -> None:
+        self.classifier = _NaiveBayes(_SEEDS)
+        self.min_confidence = min_confidence
+        self.agent_latency: Optional[float] = None
+
+    def observe_agent_latency(self, seconds: float) -> None:
+        if self.agent_latency is None:
+            self.agent_latency = seconds
+        else:
+            self.agent_latency += LATENCY_EWMA_ALPHA * (seconds - self.agent_latency)
+
+    def latency_saved(self, fast_seconds: float) -> float:
+        """Estimated seconds saved by answering on the fast path (0 until the agent has been timed)."""
+        if self.agent_latency is None:
+            return 0.0
+        return max(0.0, self.agent_latency - fast_seconds)
+
+    def classify(self, question: str) -> Optional[Tuple[str, str]]:
+        """Return (intent, equipment_id) for single-tool questions, else None."""
+        tags = set(extract_equipment_tags(question))
+        if len(tags) != 1 or _OPEN_CUES.search(question):
+            return None
+        cued = [intent for intent, pattern in _INTENT_CUES.items() if pattern.search(question)]
+        label, confidence = self.classifier.predict(question)
+        if label == OPEN or confidence < self.min_confidence:
+            return None
+        # Keyword cues must agree with the classifier (predict questions often mention sensors too)
+        if label not in cued:
+            return None
+        return label, tags.pop()
+
+    def route(self, question: str) -> Optional[RouteResult]:
+        match = self.classify(question)
+        if match is None:
+            return None
+        intent, equipment_id = match
+        sensors = tools._sensor_live_data(equipment_id)
+        if not sensors:
+            return RouteResult(intent, equipment_id, f"No live sensor data is available for {equipment_id}.")
+        if intent == SENSORS:
+            return RouteResult(intent, equipment_id, f"Latest sensor readings for {equipment_id}: {_format_sensors(sensors)}.")
+        prob = tools._predict_failure(sensors)
+        return RouteResult(
+            intent,
+            equipment_id,
+            f"Predicted failure probability for {equipment_id} is {prob:.0%} "
+            f"(based on {_format_sensors(sensors)}).",
+        )
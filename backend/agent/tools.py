@@ -1,10 +1,20 @@
 """LangChain tools for the Smart Building agent."""
 from __future__ import annotations
 
-from typing import List, Dict, Any
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
 
 from langchain_core.tools import StructuredTool
 
+from backend.metrics import record_cache, stage
+from backend.profiling import to_thread
 from backend.rag.manager import DocumentAssistant
 from backend.services.mcp import fetch_live_data
 from backend.predictive.maintenance import HealthPredictor
@@ -14,9 +24,21 @@ _doc_assist = DocumentAssistant()
 _predictor = HealthPredictor()
 
 
-def _vector_search(query: str, k: int = 4) -> List[str]:
-    """Return top-k text chunks relevant to `query`."""
-    chunks = _doc_assist.similarity_search(query, k)
+def _vector_search(
+    query: str,
+    k: int = 4,
+    filters: Optional[Dict[str, str]] = None,
+    shards: Optional[List[str]] = None,
+) -> List[str]:
+    """Return top-k text chunks relevant to `query`.
+
+    `filters` may restrict by equipment, source, doc_type or building;
+    `shards` selects building/tenant indexes (["*"] searches all).
+    """
+    try:
+        chunks = _doc_assist.similarity_search(query, k, filters=filters, shards=shards)
+    except ValueError as e:
+        return [f"(invalid search arguments: {e})"]
     if not chunks:
         return ["(no documents ingested yet)"]
     return chunks
@@ -54,9 +76,81 @@ def _sql_query(sql: str) -> str:  # pragma: no cover – placeholder
         return f"SQL error: {e}"
 
 
+# ---------------- Memoization ----------------
+
+# Seconds a tool result is reused across agent runs (per-run reuse is unbounded)
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL_SECONDS", "10"))
+
+_run_cache: ContextVar[Optional[Dict[str, Any]]] = ContextVar("tool_run_cache", default=None)
+_shared_cache: Dict[str, Tuple[float, Any]] = {}
+_shared_lock = threading.Lock()
+
+
+@contextmanager
+def tool_run_scope() -> Iterator[None]:
+    """Memoize tool results for the duration of one agent run.
+
+    The cache dict lives in a ContextVar, so tool calls the executor runs in
+    parallel tasks or worker threads of the same run share it.
+    """
+    token = _run_cache.set({})
+    try:
+        yield
+    finally:
+        _run_cache.reset(token)
+
+
+def _memoized(name: str, func: Callable[..., Any], ttl: float) -> Callable[..., Any]:
+    """Wrap `func` so identical calls (tool name + arguments) are served from cache."""
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = name + ":" + json.dumps(bound.arguments, sort_keys=True, default=str)
+
+        run = _run_cache.get()
+        if run is not None and key in run:
+            record_cache("tool_run", hit=True)
+            return run[key]
+        now = time.monotonic()
+        with _shared_lock:
+            hit = _shared_cache.get(key)
+        if hit is not None and hit[0] > now:
+            record_cache("tool_shared", hit=True)
+            result = hit[1]
+        else:
+            record_cache("tool_shared", hit=False)
+            with stage("tool", name):
+                result = func(*args, **kwargs)
+            if ttl > 0:
+                with _shared_lock:
+                    # Drop expired entries so the shared cache stays small
+                    for stale in [k for k, (exp, _) in _shared_cache.items() if exp <= now]:
+                        del _shared_cache[stale]
+                    _shared_cache[key] = (now + ttl, result)
+        if run is not None:
+            run[key] = result
+        return result
+
+    return wrapper
+
+
+def _tool(func: Callable[..., Any], name: str, description: str, ttl: float = TOOL_CACHE_TTL) -> StructuredTool:
+    """Build a memoized tool with an async variant so the executor can run calls concurrently."""
+    cached = _memoized(name, func, ttl)
+
+    async def _acall(**kwargs: Any) -> Any:
+        return await to_thread(cached, **kwargs)
+
+    return StructuredTool.from_function(cached, name=name, description=description, coroutine=_acall)
+
+
 TOOLS: List[StructuredTool] = [
-    StructuredTool.from_function(_vector_search, name="vector_search", description="Search building document chunks relevant to a question."),
-    StructuredTool.from_function(_sensor_live_data, name="sensor_live_data", description="Get latest sensor readings for a piece of equipment."),
-    StructuredTool.from_function(_predict_failure, name="predict_failure", description="Predict probability of equipment failure based on sensor data (dict)."),
-    StructuredTool.from_function(_sql_query, name="sql_query", description="Run a read-only SQL query against the building DB."),
-] 
\ No newline at end of file
+    _tool(_vector_search, name="vector_search", description="Search building document chunks relevant to a question. Optional filters dict narrows by equipment (e.g. HVAC-01), source, doc_type or building; optional shards list selects building indexes ('*' for all)."),
+    _tool(_sensor_live_data, name="sensor_live_data", description="Get latest sensor readings for a piece of equipment."),
+    _tool(_predict_failure, name="predict_failure", description="Predict probability of equipment failure based on sensor data (dict)."),
+    # DB contents can change between runs, so only reuse results within a run
+    _tool(_sql_query, name="sql_query", description="Run a read-only SQL query against the building DB.", ttl=0),
+]
@@ -0,0 +1,321 @@
+"""Pooled LLM clients shared by /ask, /ask/batch and the agent.
+
+Clients are created once per (backend, model, temperature) and reuse one
+keep-alive HTTP connection pool, one retry/timeout policy, one global
+request-rate limiter and one global cap on in-flight requests, enforced in the
+HTTP transport so agent calls count against it too. `get_llm` adds in-flight
+coalescing: identical prompts issued concurrently share a single upstream call.
+
+Backends are selected with LLM_BACKEND:
+    openai  – OpenAI API (default)
+    local   – any OpenAI-compatible server at LOCAL_LLM_BASE_URL (vLLM,
+              Ollama, llama.cpp …); the default when CONFIDENTIAL_MODE=true
+    stub    – deterministic offline model for tests and load tests
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult, LLMResult
+from langchain_core.rate_limiters import InMemoryRateLimiter
+
+from backend.metrics import LLM_TOKENS, record_cache, stage
+from backend.profiling import to_thread
+
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# 0 disables the request-rate limiter
+LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "0"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+
+def _backend() -> str:
+    default = "local" if os.getenv("CONFIDENTIAL_MODE", "false").lower() == "true" else "openai"
+    return os.getenv("LLM_BACKEND", default).lower()
+
+
+class _TokenUsageCallback(BaseCallbackHandler):
+    """Count prompt/completion tokens of every call, including agent steps."""
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for gen in generations:
+                usage = getattr(getattr(gen, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.labels(model=self.model_name, kind="prompt").inc(usage.get("input_tokens", 0))
+                    LLM_TOKENS.labels(model=self.model_name, kind="completion").inc(usage.get("output_tokens", 0))
+
+
+class StubChatModel(BaseChatModel):
+    """Deterministic offline chat model: same prompt, same answer.
+
+    LLM_STUB_LATENCY_MS adds a fixed delay per call to mimic upstream latency.
+    """
+
+    model_name: str = "stub"
+    latency_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _reply(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        question = prompt.rsplit("QUESTION:", 1)[-1].split("\n")[0].strip()[:80]
+        text = f"[stub {self.model_name} {digest}] {question}".strip()
+        # Whitespace word counts stand in for real token usage
+        n_in, n_out = len(prompt.split()), len(text.split())
+        usage = {"input_tokens": n_in, "output_tokens": n_out, "total_tokens": n_in + n_out}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    # No HTTP transport to hold the concurrency cap, so the stub takes it itself
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        with _concurrency:
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000)
+            return self._reply(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        async with _concurrency:
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000)
+            return self._reply(messages)
+
+
+class _ConcurrencyLimit:
+    """Process-wide cap on in-flight LLM requests, shared by sync and async callers."""
+
+    def __init__(self, limit: int) -> None:
+        self._sem = threading.BoundedSemaphore(limit)
+
+    def acquire(self) -> None:
+        self._sem.acquire()
+
+    async def aacquire(self) -> None:
+        # Never block the event loop on the thread semaphore; back off instead
+        delay = 0.001
+        while not self._sem.acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def release(self) -> None:
+        self._sem.release()
+
+    def __enter__(self) -> "_ConcurrencyLimit":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+    async def __aenter__(self) -> "_ConcurrencyLimit":
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.release()
+
+
+_lock = threading.Lock()
+_models: Dict[Tuple[str, str, float], BaseChatModel] = {}
+_pooled: Dict[Tuple[str, str, float], "PooledLLM"] = {}
+_http: Dict[str, Any] = {}
+_rate_limiter: Optional[InMemoryRateLimiter] = None
+_concurrency = _ConcurrencyLimit(LLM_MAX_CONCURRENCY)
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that frees its concurrency slot once the body is closed."""
+
+    def __init__(self, stream: Any, limit: _ConcurrencyLimit) -> None:
+        self._stream = stream
+        self._limit: Optional[_ConcurrencyLimit] = limit
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if self._limit is not None:
+                self._limit.release()
+                self._limit = None
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any, limit: _ConcurrencyLimit) -> None:
+        self._stream = stream
+        self._limit: Optional[_ConcurrencyLimit] = limit
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._limit is not None:
+                self._limit.release()
+                self._limit = None
+
+
+class _LimitedTransport(httpx.BaseTransport):
+    """Hold a `_concurrency` slot from sending a request until its response is closed."""
+
+    def __init__(self, inner: httpx.BaseTransport, limit: Optional[_ConcurrencyLimit] = None) -> None:
+        self._inner = inner
+        self._limit = limit or _concurrency
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._limit.acquire()
+        try:
+            response = self._inner.handle_request(request)
+        except BaseException:
+            self._limit.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, self._limit)
+        return response
+
+    def close(self) -> None:
+        self._inner.close()
+
+
+class _AsyncLimitedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, limit: Optional[_ConcurrencyLimit] = None) -> None:
+        self._inner = inner
+        self._limit = limit or _concurrency
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._limit.aacquire()
+        try:
+            response = await self._inner.handle_async_request(request)
+        except BaseException:
+            self._limit.release()
+            raise
+        response.stream = _AsyncReleasingStream(response.stream, self._limit)
+        return response
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+def _shared_http() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    if not _http:
+        limits = httpx.Limits(max_connections=LLM_MAX_CONCURRENCY * 2, max_keepalive_connections=LLM_MAX_CONCURRENCY)
+        _http["sync"] = httpx.Client(
+            transport=_LimitedTransport(httpx.HTTPTransport(limits=limits)), timeout=LLM_TIMEOUT_SECONDS
+        )
+        _http["async"] = httpx.AsyncClient(
+            transport=_AsyncLimitedTransport(httpx.AsyncHTTPTransport(limits=limits)), timeout=LLM_TIMEOUT_SECONDS
+        )
+    return _http["sync"], _http["async"]
+
+
+def _shared_rate_limiter() -> Optional[InMemoryRateLimiter]:
+    global _rate_limiter
+    if _rate_limiter is None and LLM_REQUESTS_PER_SECOND > 0:
+        _rate_limiter = InMemoryRateLimiter(requests_per_second=LLM_REQUESTS_PER_SECOND, max_bucket_size=max(1, LLM_MAX_CONCURRENCY))
+    return _rate_limiter
+
+
+def _build(backend: str, model_name: str, temperature: float) -> BaseChatModel:
+    if backend == "stub":
+        return StubChatModel(
+            model_name=model_name,
+            latency_ms=float(os.getenv("LLM_STUB_LATENCY_MS", "0")),
+            rate_limiter=_shared_rate_limiter(),
+            callbacks=[_TokenUsageCallback(model_name)],
+        )
+
+    from langchain_openai import ChatOpenAI
+
+    http_client, http_async_client = _shared_http()
+    kwargs: Dict[str, Any] = {}
+    if backend == "local":
+        kwargs["base_url"] = os.getenv("LOCAL_LLM_BASE_URL", "http://localhost:11434/v1")
+        kwargs["api_key"] = os.getenv("LOCAL_LLM_API_KEY", "not-needed")
+        model_name = os.getenv("LOCAL_LLM_MODEL", "mistral-7b-instruct")
+    elif backend != "openai":
+        raise ValueError(f"Unknown LLM_BACKEND {backend!r}; expected openai, local or stub")
+    return ChatOpenAI(
+        model_name=model_name,
+        temperature=temperature,
+        max_retries=LLM_MAX_RETRIES,
+        timeout=LLM_TIMEOUT_SECONDS,
+        http_client=http_client,
+        http_async_client=http_async_client,
+        rate_limiter=_shared_rate_limiter(),
+        callbacks=[_TokenUsageCallback(model_name)],
+        **kwargs,
+    )
+
+
+def get_chat_model(model_name: str = DEFAULT_MODEL, temperature: float = 0.2) -> BaseChatModel:
+    """Return the long-lived chat model for this backend/model/temperature."""
+    key = (_backend(), model_name, temperature)
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            model = _models[key] = _build(*key)
+        return model
+
+
+class PooledLLM:
+    """Prompt-in, text-out wrapper that coalesces identical in-flight prompts."""
+
+    def __init__(self, model: BaseChatModel) -> None:
+        self.model = model
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def predict(self, prompt: str) -> str:
+        with self._lock:
+            future = self._inflight.get(prompt)
+            leader = future is None
+            if leader:
+                future = self._inflight[prompt] = Future()
+        record_cache("llm_inflight", hit=not leader)
+        if not leader:
+            return future.result()
+
+        try:
+            with stage("llm", "invoke", model=getattr(self.model, "model_name", "")):
+                text = self.model.invoke(prompt).content
+            future.set_result(text)
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(prompt, None)
+        return future.result()
+
+    async def apredict(self, prompt: str) -> str:
+        return await to_thread(self.predict, prompt)
+
+
+def get_llm(model_name: str = DEFAULT_MODEL, temperature: float = 0.2) -> PooledLLM:
+    key = (_backend(), model_name, temperature)
+    with _lock:
+        pooled = _pooled.get(key)
+    if pooled is None:
+        model = get_chat_model(model_name, temperature)
+        with _lock:
+            pooled = _pooled.setdefault(key, PooledLLM(model))
+    return pooled
@@ -3,13 +3,17 @@
 Run locally with:
     LOCAL_MODE=true python backend/main.py
 """
+import asyncio
 import os
+import shutil
 import tempfile
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 
 # Instrumentation libraries are optional in local dev / test
 try:
@@ -22,8 +26,24 @@ try:
 except ImportError:  # pragma: no cover
     FastAPIInstrumentor = None  # type: ignore
 
-from backend.rag.manager import DocumentAssistant
+from backend.metrics import (
+    AGENT_LATENCY,
+    AGENT_LATENCY_SAVED,
+    AGENT_REQUESTS,
+    RAG_CONTEXT_TOKENS,
+    RAG_CONTEXT_TOKENS_SAVED,
+    configure_tracing,
+    stage,
+)
+from backend.rag.context import DEFAULT_TOKEN_BUDGET, build_context
+from backend.rag.manager import DEFAULT_SHARD, DocumentAssistant, PartialIngestError
 from backend.agent.builder import get_agent
+from backend.agent.router import FastPathRouter
+from backend.admission import AdmissionController, AdmissionMiddleware
+from backend import profiling
+from backend.profiling import to_thread
+from backend.agent.tools import tool_run_scope
+from backend.llm_factory import DEFAULT_MODEL, get_llm
 
 # Load env vars
 load_dotenv()
@@ -44,6 +64,9 @@ predictor = HealthPredictor()
 # Lazily create agent (uses same doc_assist via underlying tool singleton)
 _agent_executor = None
 
+# Single-tool questions are answered without the agent
+fast_path = FastPathRouter()
+
 app = FastAPI(title="Smart Building AI – Backend", docs_url="/docs" if os.getenv("LOCAL_MODE") else None)
 
 # Allow localhost JS during dev only
@@ -55,6 +78,15 @@ if os.getenv("LOCAL_MODE"):
         allow_headers=["*"],
     )
 
+# Admin-only profiling hooks (ENABLE_PROFILING + PROFILING_ADMIN_TOKEN); installed
+# first so it sits inside admission control and only times the request itself
+profiler = profiling.install(app)
+
+# Per-endpoint concurrency limits and bounded queues for the expensive routes;
+# cheap routes (/healthz, /health/{id}, /metrics) bypass admission entirely
+admission = AdmissionController()
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
 
 @app.get("/healthz")
 async def healthz() -> dict[str, str]:
@@ -66,51 +98,113 @@ async def healthz() -> dict[str, str]:
 
 
 @app.post("/upload-document")
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(
+    file: UploadFile = File(...),
+    building: Optional[str] = Form(None),
+    shard: str = Form(DEFAULT_SHARD),
+):
     fname = file.filename.lower()
     if not (fname.endswith(".pdf") or fname.endswith(".csv")):
         raise HTTPException(status_code=400, detail="PDF or CSV only")
 
     suffix = ".pdf" if fname.endswith(".pdf") else ".csv"
     tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    tmp.write(await file.read())
-    tmp.flush()
+    try:
+        # Copy in chunks so large binders are never held in memory as one bytes object
+        shutil.copyfileobj(file.file, tmp)
+        tmp.close()
+
+        # Blocking work runs in a thread so cheap endpoints keep being served meanwhile
+        ingest = doc_assist.ingest_pdf if suffix == ".pdf" else doc_assist.ingest_csv
+        before = doc_assist.get_document(file.filename, shard)
+        num_chunks = await to_thread(ingest, tmp.name, source=file.filename, building=building, shard=shard)
+        document = doc_assist.get_document(file.filename, shard)
+    except PartialIngestError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        # The index keeps the chunks; the uploaded copy is no longer needed
+        tmp.close()
+        os.unlink(tmp.name)
+
+    # Re-uploading an identical file is a no-op; a new revision re-embeds only changed chunks
+    unchanged = before is not None and document is not None and before["content_hash"] == document["content_hash"]
+    return {
+        "status": "unchanged" if unchanged else "success",
+        "chunks": num_chunks,
+        "file_type": suffix,
+        "shard": shard,
+        "document": document,
+    }
 
-    if suffix == ".pdf":
-        num_chunks = doc_assist.ingest_pdf(tmp.name)
-    else:
-        num_chunks = doc_assist.ingest_csv(tmp.name)
 
-    return {"status": "success", "chunks": num_chunks, "file_type": suffix}
+@app.get("/documents")
+async def list_documents(shard: str = DEFAULT_SHARD):
+    """Documents registered in a shard with their content hash and chunk count."""
+    try:
+        documents = await to_thread(doc_assist.list_documents, shard)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"shard": shard, "documents": documents}
+
+
+@app.delete("/documents/{source:path}")
+async def delete_document(source: str, shard: str = DEFAULT_SHARD):
+    """Remove every chunk of an ingested document (by original file name)."""
+    try:
+        removed = await to_thread(doc_assist.delete_document, source, shard)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No document {source!r} in shard {shard!r}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "deleted", "source": source, "shard": shard, "chunks": removed}
 
 
 class AskRequest(BaseModel):
     query: str
     k: int = 4
+    # Restrict retrieval, e.g. {"equipment": "HVAC-01", "doc_type": "manual"}
+    filters: Optional[Dict[str, str]] = None
+    # Shard names to search (default shard if omitted, ["*"] for all)
+    shards: Optional[List[str]] = None
+    # Cap on context tokens sent to the LLM (ASK_CONTEXT_TOKEN_BUDGET by default)
+    max_context_tokens: Optional[int] = Field(None, ge=1)
 
 
-@app.post("/ask")
-async def ask(req: AskRequest):
+GREETING = {"answer": "Hello! How can I assist you today?", "citations": []}
+NO_DOCS = {"answer": "No documents ingested yet."}
+
+# Limits for /ask/batch
+ASK_BATCH_MAX_QUERIES = int(os.getenv("ASK_BATCH_MAX_QUERIES", "64"))
+ASK_BATCH_LLM_CONCURRENCY = int(os.getenv("ASK_BATCH_LLM_CONCURRENCY", "4"))
+
+
+def _is_greeting(query: str) -> bool:
     # Quick heuristic: for short greetings/one-word queries just respond politely without citations
-    if len(req.query.split()) < 3:
-        return {"answer": "Hello! How can I assist you today?", "citations": []}
+    return len(query.split()) < 3
 
-    doc_objs = doc_assist.similarity_search_docs(req.query, k=req.k)
-    if not doc_objs:
-        return {"answer": "No documents ingested yet."}
 
-    context = "\n".join([d.page_content for d in doc_objs])
+def _answer(query: str, doc_objs: List[Any], max_context_tokens: Optional[int]) -> dict:
+    """Build the prompt from retrieved chunks, call the LLM and attach citations."""
+    # Merge overlapping neighbours, drop near-duplicates and pack into the token budget
+    with stage("ask", "build_context", chunks=len(doc_objs)):
+        ctx = build_context(doc_objs, token_budget=max_context_tokens or DEFAULT_TOKEN_BUDGET)
+    RAG_CONTEXT_TOKENS.observe(ctx.tokens)
+    RAG_CONTEXT_TOKENS_SAVED.observe(ctx.tokens_saved)
+    context = ctx.text
 
     prompt = (
         "You are a helpful building-ops assistant.\n\n"
         f"CONTEXT:\n{context}\n\n"
-        f"QUESTION: {req.query}\n\nANSWER:"
+        f"QUESTION: {query}\n\nANSWER:"
     )
-    llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.2)
-    resp = llm.predict(prompt)
+    llm = get_llm(DEFAULT_MODEL, temperature=0.2)
+    with stage("ask", "llm"):
+        resp = llm.predict(prompt)
 
     citations = []
-    for d in doc_objs:
+    for d in ctx.docs:
         meta = d.metadata or {}
         citations.append({
             "source": os.path.basename(meta.get("source", "")),
@@ -121,6 +215,73 @@ async def ask(req: AskRequest):
     return {"answer": resp, "citations": citations}
 
 
+@app.post("/ask")
+async def ask(req: AskRequest):
+    if _is_greeting(req.query):
+        return dict(GREETING)
+
+    try:
+        doc_objs = await to_thread(
+            doc_assist.similarity_search_docs, req.query, k=req.k, filters=req.filters, shards=req.shards
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not doc_objs:
+        return dict(NO_DOCS)
+
+    return await to_thread(_answer, req.query, doc_objs, req.max_context_tokens)
+
+
+class AskBatchRequest(BaseModel):
+    queries: List[str]
+    k: int = 4
+    filters: Optional[Dict[str, str]] = None
+    shards: Optional[List[str]] = None
+    max_context_tokens: Optional[int] = Field(None, ge=1)
+
+
+@app.post("/ask/batch")
+async def ask_batch(req: AskBatchRequest):
+    """Answer many RAG questions with one embedding call and one ANN search.
+
+    LLM calls run concurrently, at most ASK_BATCH_LLM_CONCURRENCY at a time.
+    Results come back in input order; a failing item carries an "error"
+    instead of failing the whole batch.
+    """
+    if len(req.queries) > ASK_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {ASK_BATCH_MAX_QUERIES} queries per batch")
+
+    rag_idx = [i for i, q in enumerate(req.queries) if not _is_greeting(q)]
+    try:
+        doc_lists = await to_thread(
+            doc_assist.similarity_search_docs_batch,
+            [req.queries[i] for i in rag_idx],
+            k=req.k,
+            filters=req.filters,
+            shards=req.shards,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    retrieved = dict(zip(rag_idx, doc_lists))
+
+    sem = asyncio.Semaphore(ASK_BATCH_LLM_CONCURRENCY)
+
+    async def _one(i: int, query: str) -> dict:
+        if i not in retrieved:
+            return {"query": query, **GREETING}
+        if not retrieved[i]:
+            return {"query": query, **NO_DOCS}
+        async with sem:
+            try:
+                return {"query": query, **await to_thread(_answer, query, retrieved[i], req.max_context_tokens)}
+            except Exception as e:
+                return {"query": query, "error": str(e)}
+
+    results = await asyncio.gather(*(_one(i, q) for i, q in enumerate(req.queries)))
+    unique_chunks = len({id(d) for docs in doc_lists for d in docs})
+    return {"results": results, "unique_chunks": unique_chunks}
+
+
 # ---------------- Predictive maintenance endpoint ----------------
 
 
@@ -155,10 +316,25 @@ class AgentRequest(BaseModel):
 @app.post("/agent")
 async def agent_endpoint(req: AgentRequest):
     global _agent_executor
+    started = time.perf_counter()
+    # Fast-path tools do blocking I/O (sensor fetch, model inference)
+    routed = await to_thread(fast_path.route, req.question)
+    if routed is not None:
+        elapsed = time.perf_counter() - started
+        AGENT_REQUESTS.labels(route="fast_path").inc()
+        AGENT_LATENCY.labels(route="fast_path").observe(elapsed)
+        AGENT_LATENCY_SAVED.inc(fast_path.latency_saved(elapsed))
+        return {"answer": routed.answer, "route": "fast_path"}
+
     if _agent_executor is None:
         _agent_executor = get_agent()
-    result = _agent_executor.invoke({"input": req.question, "chat_history": []})
-    return {"answer": result["output"]}
+    with tool_run_scope():
+        result = await _agent_executor.ainvoke({"input": req.question, "chat_history": []})
+    elapsed = time.perf_counter() - started
+    AGENT_REQUESTS.labels(route="agent").inc()
+    AGENT_LATENCY.labels(route="agent").observe(elapsed)
+    fast_path.observe_agent_latency(elapsed)
+    return {"answer": result["output"], "route": "agent"}
 
 
 if __name__ == "__main__":
@@ -176,6 +352,7 @@ if __name__ == "__main__":
 if Instrumentator is not None:  # pragma: no cover
     Instrumentator().instrument(app).expose(app, include_in_schema=False)
 
-# OpenTelemetry tracing (no-op exporter unless configured)
+# OpenTelemetry tracing (no-op exporter unless OTEL_EXPORTER_OTLP_ENDPOINT is set)
+configure_tracing()
 if FastAPIInstrumentor is not None:  # pragma: no cover
     FastAPIInstrumentor().instrument_app(app) 
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""Prometheus metrics and tracing helpers shared by the backend modules.
+
+Everything registers on the default registry, so the `/metrics` endpoint
+exposed by `prometheus_fastapi_instrumentator` in `backend/main.py` serves
+these alongside the per-request HTTP metrics. `stage()` times one pipeline
+stage into a histogram and, when OpenTelemetry is installed, wraps it in a
+span. Missing `prometheus_client` / `opentelemetry` degrade to no-ops.
+"""
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram  # type: ignore
+except ImportError:  # pragma: no cover
+
+    class _NoopMetric:
+        def __init__(self, *_: Any, **__: Any) -> None:
+            pass
+
+        def labels(self, *_: Any, **__: Any) -> "_NoopMetric":
+            return self
+
+        def inc(self, *_: Any, **__: Any) -> None:
+            pass
+
+        def dec(self, *_: Any, **__: Any) -> None:
+            pass
+
+        def set(self, *_: Any, **__: Any) -> None:
+            pass
+
+        def observe(self, *_: Any, **__: Any) -> None:
+            pass
+
+    Counter = Gauge = Histogram = _NoopMetric  # type: ignore
+
+try:
+    from opentelemetry import trace  # type: ignore
+
+    _tracer = trace.get_tracer("smart-building-backend")
+except ImportError:  # pragma: no cover
+    trace = None  # type: ignore
+    _tracer = None
+
+_TOKEN_BUCKETS = (0, 50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# ---------------- RAG context assembly ----------------
+
+RAG_CONTEXT_TOKENS = Histogram(
+    "rag_context_tokens",
+    "Tokens of retrieved context sent to the LLM per /ask request",
+    buckets=_TOKEN_BUCKETS,
+)
+RAG_CONTEXT_TOKENS_SAVED = Histogram(
+    "rag_context_tokens_saved",
+    "Tokens removed per /ask request by merging, de-duplication and the token budget",
+    buckets=_TOKEN_BUCKETS,
+)
+
+# ---------------- Agent routing ----------------
+
+AGENT_REQUESTS = Counter(
+    "agent_requests_total",
+    "Questions answered by /agent, by route (fast_path or agent)",
+    ["route"],
+)
+AGENT_LATENCY = Histogram(
+    "agent_latency_seconds",
+    "End-to-end /agent latency by route",
+    ["route"],
+)
+AGENT_LATENCY_SAVED = Counter(
+    "agent_fast_path_latency_saved_seconds_total",
+    "Estimated agent latency avoided by fast-path answers (running mean of agent latency minus fast-path latency)",
+)
+
+# ---------------- Admission control ----------------
+
+ADMISSION_INFLIGHT = Gauge(
+    "admission_inflight_requests",
+    "Requests currently executing per admission-controlled endpoint",
+    ["endpoint"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for a slot per admission-controlled endpoint",
+    ["endpoint"],
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests shed by admission control, by endpoint and status (429 queue full, 503 wait timeout)",
+    ["endpoint", "status"],
+)
+
+# ---------------- Pipeline stages, tokens and caches ----------------
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Time spent per pipeline stage (component: rag, ask, llm, tool, predictor)",
+    ["component", "stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "LLM tokens by model and kind (prompt or completion)",
+    ["model", "kind"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss)",
+    ["cache", "result"],
+)
+
+
+@contextmanager
+def stage(component: str, name: str, **attributes: Any) -> Iterator[None]:
+    """Time a pipeline stage into PIPELINE_STAGE_SECONDS inside a tracing span."""
+    started = time.perf_counter()
+    try:
+        if _tracer is None:
+            yield
+        else:
+            with _tracer.start_as_current_span(f"{component}.{name}", attributes=attributes):
+                yield
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(component=component, stage=name).observe(time.perf_counter() - started)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def configure_tracing(service_name: str = "smart-building-backend") -> bool:
+    """Export spans over OTLP/HTTP when OTEL_EXPORTER_OTLP_ENDPOINT is set.
+
+    Returns False (spans stay no-op) if the endpoint is unset or the
+    OpenTelemetry SDK / exporter packages are not installed.
+    """
+    if trace is None or not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return False
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter  # type: ignore
+        from opentelemetry.sdk.resources import Resource  # type: ignore
+        from opentelemetry.sdk.trace import TracerProvider  # type: ignore
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor  # type: ignore
+    except ImportError:  # pragma: no cover
+        return False
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    return True
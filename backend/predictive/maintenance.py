@@ -7,6 +7,8 @@ import os
 import random
 from pathlib import Path
 
+from backend.metrics import stage
+
 try:
     import h2o  # type: ignore
 
@@ -26,12 +28,13 @@ class HealthPredictor:
             self.model = None
 
     def predict(self, sensor_dict: dict) -> float:
-        if self.use_h2o and self.model is not None:  # pragma: no cover
-            frame = h2o.H2OFrame([sensor_dict])  # type: ignore
-            prob = float(self.model.predict(frame).as_data_frame().iloc[0, 0])  # type: ignore
-        else:
-            # simple heuristic: higher vibration/temperature -> higher risk
-            base = 0.1 + 0.005 * sensor_dict.get("temperature", 70)
-            base += 0.5 * sensor_dict.get("vibration", 0)
-            prob = min(max(base, 0), 1)
+        with stage("predictor", "score", model="h2o" if self.use_h2o else "heuristic"):
+            if self.use_h2o and self.model is not None:  # pragma: no cover
+                frame = h2o.H2OFrame([sensor_dict])  # type: ignore
+                prob = float(self.model.predict(frame).as_data_frame().iloc[0, 0])  # type: ignore
+            else:
+                # simple heuristic: higher vibration/temperature -> higher risk
+                base = 0.1 + 0.005 * sensor_dict.get("temperature", 70)
+                base += 0.5 * sensor_dict.get("vibration", 0)
+                prob = min(max(base, 0), 1)
         return prob 
\ No newline at end of file
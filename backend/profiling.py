@@ -0,0 +1,455 @@
+"""On-demand profiling of a live worker (admin only, off by default).
+
+With ENABLE_PROFILING=true and PROFILING_ADMIN_TOKEN set, the routes below
+are mounted; every call must send the token in the X-Admin-Token header.
+
+    POST   /admin/profiling/requests         {"path": "/ask", "count": 20, "mode": "cprofile"}
+    GET    /admin/profiling/requests         current / last capture
+    DELETE /admin/profiling/requests         stop early, keep what was collected
+    POST   /admin/profiling/memory/start     start tracemalloc + baseline snapshot
+    POST   /admin/profiling/memory/snapshot  diff against the baseline
+    POST   /admin/profiling/memory/stop
+    GET    /admin/profiling/artifacts[/{name}]
+
+Request captures profile the next `count` requests to `path`:
+    cprofile  – pstats `.prof` (snakeviz, `python -m pstats`, gprof2dot). Covers
+                the event-loop thread while a profiled request is in flight
+                (concurrent requests show up too) plus blocking work it hands
+                to `to_thread`.
+    sampling  – every thread's stack each PROFILING_SAMPLE_INTERVAL_MS while a
+                profiled request is in flight, as collapsed stacks
+                (`.collapsed`; speedscope, flamegraph.pl).
+Memory snapshots are written with `tracemalloc.Snapshot.dump` (load with
+`tracemalloc.Snapshot.load`) next to a plain-text diff report.
+"""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+
+PROFILING_ENABLED = os.getenv("ENABLE_PROFILING", "false").lower() == "true"
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+PROFILING_DIR = Path(os.getenv("PROFILING_DIR", str(Path(tempfile.gettempdir()) / "sba-profiles")))
+SAMPLE_INTERVAL = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", "5")) / 1000
+
+MODES = ("cprofile", "sampling")
+ARTIFACT_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+# Lines of the stats / diff summary returned inline
+SUMMARY_LINES = 25
+
+# Leaf frames of threads that are parked, not working (skipped by the sampler)
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+_current_capture: ContextVar[Optional["RequestCapture"]] = ContextVar("profiling_capture", default=None)
+
+
+async def to_thread(func: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """`asyncio.to_thread` that keeps cProfile coverage of the calling request."""
+    capture = _current_capture.get()
+    if capture is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return await asyncio.to_thread(capture.run_profiled, func, *args, **kwargs)
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({'/'.join(Path(code.co_filename).parts[-2:])}:{code.co_firstlineno})"
+
+
+def _collapse(frame: Any) -> Optional[str]:
+    """Root-first `a;b;c` stack of `frame`, or None for an idle thread."""
+    if (Path(frame.f_code.co_filename).name, frame.f_code.co_name) in _IDLE_FRAMES:
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+# ---------------- Request captures ----------------
+
+
+class RequestCapture:
+    """Profile the next `count` requests matching `method` / `path`."""
+
+    def __init__(self, path: str, count: int, mode: str, method: Optional[str] = None) -> None:
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{mode}"
+        self.path = path.rstrip("/") or "/"
+        self.method = method.upper() if method else None
+        self.mode = mode
+        self.count = count
+        self.remaining = count
+        self.completed = 0
+        self.inflight = 0
+        self._lock = threading.Lock()
+        self._profiles: List[cProfile.Profile] = []
+        self._loop_profiler: Optional[cProfile.Profile] = None
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        if mode == "sampling":
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiling-sampler", daemon=True)
+            self._sampler.start()
+
+    def matches(self, method: str, path: str) -> bool:
+        return (path.rstrip("/") or "/") == self.path and (self.method is None or method == self.method)
+
+    def claim(self) -> bool:
+        """Reserve one of the remaining slots; call from the event-loop thread."""
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            self.inflight += 1
+            if self.inflight == 1 and self.mode == "cprofile":
+                self._loop_profiler = cProfile.Profile()
+                self._loop_profiler.enable()
+            return True
+
+    def release(self) -> bool:
+        """Mark a claimed request done; True once the capture is complete."""
+        with self._lock:
+            self.inflight -= 1
+            self.completed += 1
+            if self.inflight == 0:
+                self._stop_loop_profiler()
+            return self.remaining == 0 and self.inflight == 0
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.remaining = 0
+
+    def _stop_loop_profiler(self) -> None:
+        if self._loop_profiler is not None:
+            self._loop_profiler.disable()
+            self._profiles.append(self._loop_profiler)
+            self._loop_profiler = None
+
+    def run_profiled(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if self.mode != "cprofile":
+            return func(*args, **kwargs)
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # Python 3.12+: the loop profiler is interpreter-wide and already sees this thread
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            prof.disable()
+            with self._lock:
+                self._profiles.append(prof)
+
+    def _sample_loop(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            if self.inflight == 0:
+                continue
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _collapse(frame)
+                if stack is not None:
+                    self._stacks[f"{names.get(ident, ident)};{stack}"] += 1
+            self._samples += 1
+
+    def write(self, dest_dir: Path) -> Dict[str, Any]:
+        """Stop collecting and write the artifact; returns a summary for the API."""
+        with self._lock:
+            self._stop_loop_profiler()
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        result: Dict[str, Any] = {"id": self.id, "path": self.path, "mode": self.mode, "requests": self.completed}
+
+        if self.mode == "cprofile":
+            if not self._profiles:
+                return {**result, "artifact": None, "summary": ""}
+            stats = pstats.Stats(self._profiles[0])
+            for prof in self._profiles[1:]:
+                stats.add(prof)
+            path = dest_dir / f"{self.id}.prof"
+            stats.dump_stats(str(path))
+            out = io.StringIO()
+            pstats.Stats(str(path), stream=out).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+            return {**result, "artifact": path.name, "summary": out.getvalue()}
+
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        path = dest_dir / f"{self.id}.collapsed"
+        path.write_text("".join(f"{stack} {n}\n" for stack, n in self._stacks.most_common()))
+        top = [{"stack": stack.rsplit(";", 3)[-3:], "samples": n} for stack, n in self._stacks.most_common(10)]
+        return {**result, "artifact": path.name, "samples": self._samples, "top": top}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "path": self.path,
+            "method": self.method,
+            "mode": self.mode,
+            "count": self.count,
+            "completed": self.completed,
+            "inflight": self.inflight,
+        }
+
+
+# ---------------- Memory snapshots ----------------
+
+
+class MemoryTracker:
+    """tracemalloc baseline + diff snapshots."""
+
+    def __init__(self) -> None:
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.baseline_id: Optional[str] = None
+        self._started_tracing = False
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def start(self, dest_dir: Path, frames: int) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._started_tracing = True
+        self.baseline = self._snapshot()
+        self.baseline_id = f"mem-{time.strftime('%Y%m%d-%H%M%S')}-baseline"
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        self.baseline.dump(str(dest_dir / f"{self.baseline_id}.tracemalloc"))
+        return {"artifact": f"{self.baseline_id}.tracemalloc", "traced_kb": tracemalloc.get_traced_memory()[0] // 1024}
+
+    def diff(self, dest_dir: Path, key_type: str, limit: int) -> Dict[str, Any]:
+        if self.baseline is None:
+            raise RuntimeError("Memory tracking not started")
+        snap = self._snapshot()
+        stats = snap.compare_to(self.baseline, key_type)
+        snap_id = f"mem-{time.strftime('%Y%m%d-%H%M%S')}"
+        snap.dump(str(dest_dir / f"{snap_id}.tracemalloc"))
+        report = dest_dir / f"{snap_id}-diff.txt"
+        with report.open("w") as f:
+            f.write(f"# diff against {self.baseline_id} ({key_type})\n")
+            for stat in stats:
+                f.write(f"{stat}\n")
+                if key_type == "traceback":
+                    f.writelines(f"    {line}\n" for line in stat.traceback.format())
+        return {
+            "artifacts": [f"{snap_id}.tracemalloc", report.name],
+            "traced_kb": tracemalloc.get_traced_memory()[0] // 1024,
+            "top": [
+                {
+                    "location": str(stat.traceback[0]),
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "count_diff": stat.count_diff,
+                    "size_kb": round(stat.size / 1024, 1),
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    def stop(self) -> None:
+        self.baseline = None
+        self.baseline_id = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+# ---------------- Controller, middleware and admin routes ----------------
+
+
+class ProfilingController:
+    def __init__(self, artifacts_dir: Path = PROFILING_DIR) -> None:
+        self.artifacts_dir = artifacts_dir
+        self.capture: Optional[RequestCapture] = None
+        self.last: Optional[Dict[str, Any]] = None
+        self.memory = MemoryTracker()
+
+    def start(self, capture: RequestCapture) -> None:
+        if self.capture is not None:
+            raise RuntimeError(f"Capture {self.capture.id} is still running")
+        self.capture = capture
+
+    def finish(self, capture: RequestCapture) -> Dict[str, Any]:
+        if self.capture is capture:
+            self.capture = None
+        self.last = capture.write(self.artifacts_dir)
+        return self.last
+
+    def artifacts(self) -> List[Dict[str, Any]]:
+        if not self.artifacts_dir.exists():
+            return []
+        files = sorted(self.artifacts_dir.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True)
+        return [{"name": p.name, "bytes": p.stat().st_size} for p in files if p.is_file()]
+
+    def artifact_path(self, name: str) -> Optional[Path]:
+        if not ARTIFACT_NAME_RE.match(name):
+            return None
+        path = self.artifacts_dir / name
+        return path if path.is_file() else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests claimed by the active `RequestCapture`."""
+
+    def __init__(self, app: Callable[..., Awaitable[Any]], controller: ProfilingController) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        capture = self.controller.capture
+        if (
+            scope["type"] != "http"
+            or capture is None
+            or not capture.matches(scope["method"], scope["path"])
+            or not capture.claim()
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        token = _current_capture.set(capture)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_capture.reset(token)
+            if capture.release():
+                self.controller.finish(capture)
+
+
+class CaptureRequest(BaseModel):
+    path: str
+    count: int = Field(10, ge=1, le=1000)
+    mode: str = "cprofile"
+    # Only profile this HTTP method (any method if omitted)
+    method: Optional[str] = None
+
+
+class MemoryStartRequest(BaseModel):
+    frames: int = Field(25, ge=1, le=100)
+
+
+class MemorySnapshotRequest(BaseModel):
+    # "lineno" groups by allocating line, "traceback" by full allocation stack
+    key_type: str = "lineno"
+    limit: int = Field(SUMMARY_LINES, ge=1, le=500)
+
+
+def admin_router(controller: ProfilingController, admin_token: str) -> APIRouter:
+    def require_admin(x_admin_token: str = Header("")) -> None:
+        if not hmac.compare_digest(x_admin_token.encode(), admin_token.encode()):
+            raise HTTPException(status_code=401, detail="Invalid admin token")
+
+    router = APIRouter(prefix="/admin/profiling", dependencies=[Depends(require_admin)], include_in_schema=False)
+
+    @router.post("/requests")
+    async def start_capture(req: CaptureRequest):
+        if controller.capture is not None:
+            raise HTTPException(status_code=409, detail=f"Capture {controller.capture.id} is still running")
+        try:
+            capture = RequestCapture(req.path, req.count, req.mode, req.method)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        controller.start(capture)
+        return capture.status()
+
+    @router.get("/requests")
+    async def capture_status():
+        capture = controller.capture
+        return {"active": capture.status() if capture else None, "last": controller.last}
+
+    @router.delete("/requests")
+    async def stop_capture():
+        capture = controller.capture
+        if capture is None:
+            raise HTTPException(status_code=404, detail="No capture running")
+        capture.cancel()
+        if capture.inflight:
+            # The last in-flight request writes the artifact when it finishes
+            return {"stopping": capture.status()}
+        return await asyncio.to_thread(controller.finish, capture)
+
+    @router.post("/memory/start")
+    async def memory_start(req: MemoryStartRequest = MemoryStartRequest()):
+        return await asyncio.to_thread(controller.memory.start, controller.artifacts_dir, req.frames)
+
+    @router.post("/memory/snapshot")
+    async def memory_snapshot(req: MemorySnapshotRequest = MemorySnapshotRequest()):
+        if req.key_type not in ("lineno", "filename", "traceback"):
+            raise HTTPException(status_code=400, detail="key_type must be lineno, filename or traceback")
+        try:
+            return await asyncio.to_thread(controller.memory.diff, controller.artifacts_dir, req.key_type, req.limit)
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    @router.post("/memory/stop")
+    async def memory_stop():
+        controller.memory.stop()
+        return {"status": "stopped"}
+
+    @router.get("/artifacts")
+    async def list_artifacts():
+        return {"artifacts": controller.artifacts()}
+
+    @router.get("/artifacts/{name}")
+    async def download_artifact(name: str):
+        path = controller.artifact_path(name)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Unknown artifact")
+        return FileResponse(path, filename=name, media_type="application/octet-stream")
+
+    return router
+
+
+def install(
+    app: FastAPI,
+    enabled: Optional[bool] = None,
+    admin_token: Optional[str] = None,
+    artifacts_dir: Path = PROFILING_DIR,
+) -> Optional[ProfilingController]:
+    """Mount the profiling middleware and admin routes if enabled.
+
+    Does nothing (returns None) unless profiling is enabled (ENABLE_PROFILING)
+    and an admin token is configured (PROFILING_ADMIN_TOKEN). Call before
+    adding other middleware so admission queueing is not counted as request
+    time.
+    """
+    enabled = PROFILING_ENABLED if enabled is None else enabled
+    admin_token = PROFILING_ADMIN_TOKEN if admin_token is None else admin_token
+    if not (enabled and admin_token):
+        return None
+    controller = ProfilingController(artifacts_dir)
+    app.add_middleware(ProfilingMiddleware, controller=controller)
+    app.include_router(admin_router(controller, admin_token))
+    return controller
@@ -0,0 +1,157 @@
+"""Token-budgeted context assembly for /ask.
+
+Top-k chunks often come from neighbouring positions on the same page and the
+splitter overlaps them by 150 characters, so naive concatenation repeats text.
+`build_context` merges overlapping/adjacent chunks from the same source page,
+drops near-duplicates and packs the survivors, most relevant first, into a
+token budget.
+"""
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.documents import Document
+
+try:
+    import tiktoken  # type: ignore
+
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # pragma: no cover – tiktoken missing or encoding not downloadable
+    _ENCODING = None
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("ASK_CONTEXT_TOKEN_BUDGET", "2000"))
+# Share of a block's word shingles already in context above which it is dropped
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# Shortest suffix/prefix match treated as splitter overlap when start_index is missing
+MIN_TEXT_OVERLAP = 40
+# Do not bother truncating a block into less room than this
+MIN_PARTIAL_TOKENS = 50
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4) if text else 0
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    if _ENCODING is not None:
+        return _ENCODING.decode(_ENCODING.encode(text, disallowed_special=())[:max_tokens])
+    return text[: max_tokens * 4]
+
+
+@dataclass
+class _Block:
+    text: str
+    rank: int
+    docs: List[Document] = field(default_factory=list)
+    start: Optional[int] = None
+
+    @property
+    def end(self) -> Optional[int]:
+        return None if self.start is None else self.start + len(self.text)
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    docs: List[Document]
+    tokens: int
+    raw_tokens: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.raw_tokens - self.tokens)
+
+
+def _group_key(doc: Document) -> Tuple[Any, Any]:
+    meta = doc.metadata or {}
+    return meta.get("source"), meta.get("page")
+
+
+def _text_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    probe = right[:MIN_TEXT_OVERLAP]
+    if len(probe) < MIN_TEXT_OVERLAP:
+        return 0
+    pos = left.find(probe, max(0, len(left) - len(right)))
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return len(left) - pos
+        pos = left.find(probe, pos + 1)
+    return 0
+
+
+def _try_merge(block: _Block, doc: Document, rank: int) -> bool:
+    text = doc.page_content
+    start = (doc.metadata or {}).get("start_index")
+    if block.start is not None and start is not None:
+        if start > block.end or start + len(text) < block.start:
+            return False
+        if start < block.start:
+            block.text = text[: block.start - start] + block.text
+            block.start = start
+        if start + len(text) > block.end:
+            block.text += text[block.end - start:]
+    elif text not in block.text:
+        if (n := _text_overlap(block.text, text)):
+            block.text += text[n:]
+        elif (n := _text_overlap(text, block.text)):
+            block.text = text + block.text[n:]
+        else:
+            return False
+    block.docs.append(doc)
+    block.rank = min(block.rank, rank)
+    return True
+
+
+def _shingles(text: str, size: int = 5) -> Set[Tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _containment(candidate: Set[Any], kept: Set[Any]) -> float:
+    return len(candidate & kept) / len(candidate) if candidate else 1.0
+
+
+def build_context(docs: Sequence[Document], token_budget: int = DEFAULT_TOKEN_BUDGET) -> BuiltContext:
+    """Merge, de-duplicate and pack `docs` (ordered by relevance) into `token_budget` tokens."""
+    raw_tokens = sum(count_tokens(d.page_content) for d in docs)
+
+    groups: Dict[Tuple[Any, Any], List[_Block]] = {}
+    for rank, doc in enumerate(docs):
+        blocks = groups.setdefault(_group_key(doc), [])
+        if not any(_try_merge(b, doc, rank) for b in blocks):
+            blocks.append(_Block(doc.page_content, rank, [doc], (doc.metadata or {}).get("start_index")))
+
+    kept: List[_Block] = []
+    kept_shingles: List[Set[Tuple[str, ...]]] = []
+    for block in sorted((b for bs in groups.values() for b in bs), key=lambda b: b.rank):
+        sh = _shingles(block.text)
+        if any(_containment(sh, other) >= NEAR_DUPLICATE_THRESHOLD for other in kept_shingles):
+            continue
+        kept.append(block)
+        kept_shingles.append(sh)
+
+    parts: List[str] = []
+    used_docs: List[Document] = []
+    used = 0
+    for block in kept:
+        tokens = count_tokens(block.text)
+        remaining = token_budget - used
+        if tokens <= remaining:
+            parts.append(block.text)
+            used += tokens
+        elif remaining >= MIN_PARTIAL_TOKENS:
+            parts.append(_truncate(block.text, remaining))
+            used = token_budget
+        else:
+            continue
+        used_docs.extend(block.docs)
+
+    return BuiltContext("\n\n".join(parts), used_docs, used, raw_tokens)
@@ -0,0 +1,136 @@
+"""Structured chunk metadata and the pre-filter index used by retrieval.
+
+At ingest every chunk is tagged with the equipment IDs mentioned in its text,
+its source file, a coarse document type and the building it belongs to. The
+`FilterIndex` maps those values to FAISS row positions so a filtered query
+only scores matching vectors; on PGVector the same filters become a SQL
+WHERE clause on the jsonb metadata.
+"""
+from __future__ import annotations
+
+import os
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+# Tags like HVAC-01, CHILLER-02, AHU-3, VAV-112
+EQUIPMENT_TAG_RE = re.compile(r"\b([A-Z]{2,10})-\d{1,4}\b")
+# Prefixes of standards, codes and encodings that share the tag shape
+# (NFPA-72, ASHRAE-62, ISO-9001, UTF-8) and are never equipment
+NON_EQUIPMENT_PREFIXES = frozenset({
+    "AHRI", "ANSI", "ARI", "ASHRAE", "ASME", "ASTM", "BS", "CSA", "DIN", "EN", "EPA", "IBC",
+    "IEC", "IEEE", "IMC", "ISO", "NEC", "NEMA", "NFPA", "OSHA", "SMACNA", "UL", "UTF",
+})
+
+FILTER_FIELDS = ("equipment", "source", "doc_type", "building")
+
+_DOC_TYPE_KEYWORDS = {
+    "manual": "manual",
+    "iom": "manual",
+    "guideline": "guideline",
+    "guide": "guideline",
+    "procedure": "procedure",
+    "safety": "procedure",
+    "spec": "specification",
+    "specification": "specification",
+    "report": "report",
+}
+# Words of a file name: split on separators and camelCase ("AHU3_IOMManual.pdf")
+_NAME_TOKEN_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+def extract_equipment_tags(text: str) -> List[str]:
+    return sorted({
+        m.group(0) for m in EQUIPMENT_TAG_RE.finditer(text) if m.group(1) not in NON_EQUIPMENT_PREFIXES
+    })
+
+
+def infer_doc_type(source: str, default: str) -> str:
+    """Map file-name words (plural or singular) to a doc type, first keyword wins."""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    tokens = [t.lower() for t in _NAME_TOKEN_RE.findall(stem)]
+    for keyword, doc_type in _DOC_TYPE_KEYWORDS.items():
+        if any(t == keyword or t == keyword + "s" for t in tokens):
+            return doc_type
+    return default
+
+
+def enrich_metadata(metadata: Dict[str, Any], text: str, source: str, doc_type: str, building: Optional[str]) -> Dict[str, Any]:
+    """Add the filterable fields to a chunk's metadata in place and return it.
+
+    `equipment` is stored as a comma-delimited string (",HVAC-01,AHU-3,") so
+    the PGVector `$like` operator can test membership without array support.
+    """
+    tags = extract_equipment_tags(text)
+    if metadata.get("equipment_id"):
+        tags = sorted(set(tags) | {str(metadata["equipment_id"])})
+    metadata["source"] = os.path.basename(source)
+    metadata["doc_type"] = metadata.get("doc_type") or infer_doc_type(source, doc_type)
+    metadata["building"] = building or os.getenv("BUILDING_ID", "default")
+    metadata["equipment"] = f",{','.join(tags)}," if tags else ""
+    return metadata
+
+
+def validate_filters(filters: Optional[Mapping[str, str]]) -> Dict[str, str]:
+    """Return a clean filter dict or raise ValueError for unknown fields."""
+    if not filters:
+        return {}
+    unknown = set(filters) - set(FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unsupported filter field(s): {', '.join(sorted(unknown))}. Expected {FILTER_FIELDS}")
+    return {k: str(v) for k, v in filters.items()}
+
+
+def to_pg_filter(filters: Mapping[str, str]) -> Dict[str, Any]:
+    """Translate filters into PGVector's jsonb filter syntax."""
+    clauses = []
+    for field, value in filters.items():
+        if field == "equipment":
+            clauses.append({field: {"$like": f"%,{value},%"}})
+        elif field == "source":
+            clauses.append({field: os.path.basename(value)})
+        else:
+            clauses.append({field: value})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class FilterIndex:
+    """Inverted index from (field, value) to FAISS row positions."""
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[str, Set[int]]] = {f: defaultdict(set) for f in FILTER_FIELDS}
+
+    def add(self, position: int, metadata: Mapping[str, Any]) -> None:
+        for field in FILTER_FIELDS:
+            value = metadata.get(field)
+            if not value:
+                continue
+            values = [v for v in str(value).split(",") if v] if field == "equipment" else [str(value)]
+            for v in values:
+                self._postings[field][v].add(position)
+
+    def add_many(self, start: int, metadatas: Iterable[Mapping[str, Any]]) -> None:
+        for offset, metadata in enumerate(metadatas):
+            self.add(start + offset, metadata)
+
+    def candidates(self, filters: Mapping[str, str]) -> Set[int]:
+        """Positions matching every filter (AND semantics)."""
+        result: Optional[Set[int]] = None
+        for field, value in filters.items():
+            if field == "source":
+                value = os.path.basename(value)
+            postings = self._postings[field].get(value, set())
+            result = set(postings) if result is None else result & postings
+            if not result:
+                return set()
+        return result or set()
+
+    @classmethod
+    def from_faiss(cls, store: Any) -> "FilterIndex":
+        """Rebuild the index from a loaded FAISS store's docstore."""
+        index = cls()
+        for position, doc_id in store.index_to_docstore_id.items():
+            doc = store.docstore.search(doc_id)
+            if hasattr(doc, "metadata"):
+                index.add(position, doc.metadata)
+        return index
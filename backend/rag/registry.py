@@ -0,0 +1,193 @@
+"""Per-shard registry of ingested documents.
+
+Each source (the original file name) maps to the SHA-256 of the file it was
+ingested from and to the ids and content hashes of its chunks. Ingestion
+uses it to skip files that have not changed, to re-embed only the chunks of
+a new revision that actually differ and to find the vectors to delete when
+a document is replaced or removed.
+
+FAISS shards keep the registry as `registry.json` next to the index; PGVector
+collections keep it in the `document_registry` table. Indexes written before
+the registry existed are scanned once and their documents registered with an
+unknown file hash, so the first re-ingest replaces them instead of
+duplicating them.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+REGISTRY_FILE = "registry.json"
+_HASH_CHUNK_BYTES = 1 << 20
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_HASH_CHUNK_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(text: str, metadata: Mapping[str, Any]) -> str:
+    """Hash of a chunk's text plus the metadata shown in citations and filters.
+
+    The page number is included so a chunk that moved to another page is
+    re-embedded with the correct citation rather than reused.
+    """
+    key = json.dumps([text, metadata.get("page"), metadata.get("building")], ensure_ascii=False, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def source_key(source: str) -> str:
+    # Same normalisation as the `source` metadata field and filter
+    return os.path.basename(source)
+
+
+@dataclass
+class DocumentRecord:
+    source: str
+    # None until an ingest of this source has completed
+    content_hash: Optional[str] = None
+    # chunk id -> chunk hash
+    chunks: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"source": self.source, "content_hash": self.content_hash, "chunks": self.chunks}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "DocumentRecord":
+        return cls(data["source"], data.get("content_hash"), dict(data.get("chunks") or {}))
+
+
+class DocumentRegistry:
+    def __init__(self) -> None:
+        self.records: Dict[str, DocumentRecord] = {}
+        # Sources changed / removed since the last save (used by the Postgres store)
+        self.dirty: Set[str] = set()
+        self.removed: Set[str] = set()
+
+    def get(self, source: str) -> Optional[DocumentRecord]:
+        return self.records.get(source_key(source))
+
+    def ensure(self, source: str) -> DocumentRecord:
+        key = source_key(source)
+        self.dirty.add(key)
+        self.removed.discard(key)
+        record = self.records.get(key)
+        if record is None:
+            record = self.records[key] = DocumentRecord(key)
+        return record
+
+    def add_chunks(self, items: Iterable[Tuple[str, Mapping[str, Any]]]) -> None:
+        """Register (chunk id, metadata) pairs under their `source` metadata."""
+        for chunk_id, metadata in items:
+            self.ensure(metadata.get("source", "")).chunks[chunk_id] = metadata.get("chunk_hash", "")
+
+    def pop(self, source: str) -> Optional[DocumentRecord]:
+        key = source_key(source)
+        record = self.records.pop(key, None)
+        if record is not None:
+            self.dirty.discard(key)
+            self.removed.add(key)
+        return record
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @classmethod
+    def from_chunks(cls, items: Iterable[Tuple[str, Any]]) -> "DocumentRegistry":
+        """Build a registry by scanning (chunk id, Document) pairs of an existing index."""
+        registry = cls()
+        for chunk_id, doc in items:
+            metadata = dict(getattr(doc, "metadata", None) or {})
+            metadata.setdefault("chunk_hash", chunk_hash(doc.page_content, metadata))
+            registry.add_chunks([(chunk_id, metadata)])
+        return registry
+
+    # ---------- FAISS: JSON file next to the index ----------
+
+    def save(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = directory / f"{REGISTRY_FILE}.tmp"
+        tmp.write_text(json.dumps([r.to_dict() for r in self.records.values()]))
+        tmp.replace(directory / REGISTRY_FILE)
+        self.dirty.clear()
+        self.removed.clear()
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["DocumentRegistry"]:
+        path = directory / REGISTRY_FILE
+        if not path.exists():
+            return None
+        registry = cls()
+        for data in json.loads(path.read_text()):
+            record = DocumentRecord.from_dict(data)
+            registry.records[record.source] = record
+        return registry
+
+    # ---------- PGVector: document_registry table ----------
+
+    def save_pg(self, conn_str: str, collection: str) -> None:  # pragma: no cover – needs a live database
+        import psycopg2
+        from psycopg2.extras import Json
+
+        with psycopg2.connect(conn_str) as conn, conn.cursor() as cur:
+            cur.execute(_PG_CREATE_SQL)
+            for key in self.removed:
+                cur.execute("DELETE FROM document_registry WHERE collection = %s AND source = %s", (collection, key))
+            for key in self.dirty:
+                r = self.records[key]
+                cur.execute(_PG_UPSERT_SQL, (collection, r.source, r.content_hash, Json(r.chunks)))
+        self.dirty.clear()
+        self.removed.clear()
+
+    @classmethod
+    def load_pg(cls, conn_str: str, collection: str) -> "DocumentRegistry":  # pragma: no cover – needs a live database
+        import psycopg2
+
+        with psycopg2.connect(conn_str) as conn, conn.cursor() as cur:
+            cur.execute(_PG_CREATE_SQL)
+            cur.execute("SELECT source, content_hash, chunks FROM document_registry WHERE collection = %s", (collection,))
+            rows: List[Tuple[str, Optional[str], Dict[str, str]]] = cur.fetchall()
+            if not rows:
+                # Collection written before the registry existed: register its chunks once
+                cur.execute(_PG_SCAN_SQL, (collection,))
+                registry = cls()
+                for chunk_id, text, metadata in cur.fetchall():
+                    metadata = dict(metadata or {})
+                    metadata.setdefault("chunk_hash", chunk_hash(text, metadata))
+                    registry.add_chunks([(chunk_id, metadata)])
+                return registry
+        registry = cls()
+        for source, content_hash, chunks in rows:
+            registry.records[source] = DocumentRecord(source, content_hash, dict(chunks or {}))
+        return registry
+
+
+_PG_CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS document_registry (
+    collection TEXT NOT NULL,
+    source TEXT NOT NULL,
+    content_hash TEXT,
+    chunks JSONB NOT NULL DEFAULT '{}'::jsonb,
+    PRIMARY KEY (collection, source)
+);
+"""
+
+_PG_UPSERT_SQL = """
+INSERT INTO document_registry (collection, source, content_hash, chunks)
+VALUES (%s, %s, %s, %s)
+ON CONFLICT (collection, source) DO UPDATE
+SET content_hash = EXCLUDED.content_hash, chunks = EXCLUDED.chunks;
+"""
+
+_PG_SCAN_SQL = """
+SELECT e.custom_id, e.document, e.cmetadata
+FROM langchain_pg_embedding e JOIN langchain_pg_collection c ON e.collection_id = c.uuid
+WHERE c.name = %s;
+"""
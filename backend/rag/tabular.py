@@ -0,0 +1,401 @@
+"""Streaming CSV ingestion for sensor-history and work-order exports.
+
+Embedding every row of a million-row export is slow and adds little retrieval
+value, so numeric CSVs are read with the stdlib `csv` reader, grouped by key
+columns (e.g. equipment_id + day) and only one compact summary per group is
+embedded. The raw rows are streamed to columnar storage (Postgres when
+USE_PGVECTOR=true, otherwise Parquet) so the `sql_query` tool can still
+answer exact questions. Each ingest replaces the source's raw rows; they only
+become visible once the whole file has been read.
+"""
+from __future__ import annotations
+
+import csv
+import itertools
+import math
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+    PYARROW_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    PYARROW_AVAILABLE = False
+
+SCHEMA_SAMPLE_ROWS = 200
+# Rows per summary when a CSV has no key / time column to group on
+FALLBACK_GROUP_ROWS = 500
+# Upper bound on groups aggregated at once; oldest are flushed beyond this
+MAX_OPEN_GROUPS = 5000
+COLUMNAR_BATCH_ROWS = 10_000
+
+KEY_CANDIDATES = ("equipment_id", "equipment", "asset_id", "asset", "device_id", "work_order_id")
+TIME_CANDIDATES = ("timestamp", "datetime", "time", "date", "ts", "created_at")
+
+
+@dataclass
+class CsvSchema:
+    columns: List[str]
+    numeric: List[str]
+    text: List[str]
+    key_columns: List[str]
+    time_column: Optional[str]
+
+
+def _to_float(value: str) -> Optional[float]:
+    try:
+        num = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(num) else num
+
+
+def _to_datetime(value: str) -> Optional[datetime]:
+    """Parse an ISO timestamp as UTC; naive values are assumed to already be UTC.
+
+    Normalising here keeps exports that mix naive and offset timestamps
+    comparable when grouping and when writing the raw rows.
+    """
+    try:
+        ts = datetime.fromisoformat(value.strip())
+    except (AttributeError, ValueError):
+        return None
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+def table_name_for(path: str) -> str:
+    """Derive a safe SQL/Parquet table name from a CSV file name."""
+    stem = re.sub(r"\W+", "_", Path(path).stem.lower()).strip("_")
+    return f"csv_{stem or 'data'}"
+
+
+def infer_schema(fieldnames: Sequence[str], sample: Sequence[Dict[str, str]]) -> CsvSchema:
+    """Classify columns from the first few rows of a CSV."""
+    columns = list(fieldnames)
+    lower = {c.lower(): c for c in columns}
+
+    time_column = next((lower[c] for c in TIME_CANDIDATES if c in lower), None)
+    if time_column is not None and not any(_to_datetime(r.get(time_column, "")) for r in sample):
+        time_column = None
+    key_columns = [lower[c] for c in KEY_CANDIDATES if c in lower][:1]
+
+    numeric: List[str] = []
+    text: List[str] = []
+    for col in columns:
+        if col == time_column or col in key_columns:
+            continue
+        values = [r.get(col, "") for r in sample if r.get(col, "") != ""]
+        if values and all(_to_float(v) is not None for v in values):
+            numeric.append(col)
+        else:
+            text.append(col)
+    return CsvSchema(columns, numeric, text, key_columns, time_column)
+
+
+@dataclass
+class _GroupStats:
+    rows: int = 0
+    first_ts: Optional[datetime] = None
+    last_ts: Optional[datetime] = None
+    # column -> [count, sum, min, max]
+    numeric: Dict[str, List[float]] = field(default_factory=dict)
+    text: Dict[str, Counter] = field(default_factory=dict)
+
+    def update(self, row: Dict[str, str], schema: CsvSchema, ts: Optional[datetime]) -> None:
+        self.rows += 1
+        if ts is not None:
+            if self.first_ts is None or ts < self.first_ts:
+                self.first_ts = ts
+            if self.last_ts is None or ts > self.last_ts:
+                self.last_ts = ts
+        for col in schema.numeric:
+            num = _to_float(row.get(col, ""))
+            if num is None:
+                continue
+            st = self.numeric.get(col)
+            if st is None:
+                self.numeric[col] = [1, num, num, num]
+            else:
+                st[0] += 1
+                st[1] += num
+                st[2] = min(st[2], num)
+                st[3] = max(st[3], num)
+        for col in schema.text:
+            val = (row.get(col) or "").strip()
+            if not val:
+                continue
+            counter = self.text.setdefault(col, Counter())
+            # Cap distinct values so free-text columns cannot grow without bound
+            if val in counter or len(counter) < 20:
+                counter[val] += 1
+
+
+def _group_key(row: Dict[str, str], schema: CsvSchema, group_by: Sequence[str], ts: Optional[datetime]) -> Tuple[str, ...]:
+    key = []
+    for col in group_by:
+        if col == schema.time_column:
+            key.append(ts.date().isoformat() if ts else "")
+        else:
+            key.append(row.get(col, ""))
+    return tuple(key)
+
+
+def _summary_document(
+    key: Tuple[str, ...],
+    group_by: Sequence[str],
+    stats: _GroupStats,
+    schema: CsvSchema,
+    source: str,
+    table: Optional[str],
+) -> Document:
+    labels = []
+    metadata: Dict[str, Any] = {"source": source, "row_count": stats.rows, "doc_type": "csv_summary"}
+    for col, val in zip(group_by, key):
+        name = "day" if col == schema.time_column else col
+        labels.append(f"{name}={val}")
+        metadata[name] = val
+
+    lines = [f"Summary of {stats.rows} rows from {Path(source).name} for {', '.join(labels) or 'all rows'}."]
+    if stats.first_ts is not None:
+        lines.append(f"Time range: {stats.first_ts.isoformat()} to {stats.last_ts.isoformat()}.")
+    for col, (n, total, lo, hi) in stats.numeric.items():
+        lines.append(f"{col}: mean {total / n:.3g}, min {lo:.3g}, max {hi:.3g} ({int(n)} readings).")
+    for col, counter in stats.text.items():
+        common = ", ".join(f"{v} ({c})" for v, c in counter.most_common(5))
+        lines.append(f"{col}: {common}.")
+    if table:
+        lines.append(f"Raw rows are stored in table {table}.")
+        metadata["table"] = table
+    return Document(page_content="\n".join(lines), metadata=metadata)
+
+
+def iter_summaries(
+    path: str,
+    group_by: Optional[Sequence[str]] = None,
+    sink: Optional["ColumnarSink"] = None,
+    source: Optional[str] = None,
+) -> Iterator[Document]:
+    """Stream `path` once, yielding one summary Document per group.
+
+    Memory is bounded by MAX_OPEN_GROUPS; when more groups are open the oldest
+    is flushed early (a late row for it simply starts a new partial summary).
+    """
+    source = source or path
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        sample = list(itertools.islice(reader, SCHEMA_SAMPLE_ROWS))
+        schema = infer_schema(reader.fieldnames or [], sample)
+        if group_by is None:
+            group_by = schema.key_columns + ([schema.time_column] if schema.time_column else [])
+        if sink is not None:
+            sink.open(schema)
+
+        groups: "OrderedDict[Tuple[str, ...], _GroupStats]" = OrderedDict()
+        table = sink.table if sink is not None else None
+        committed = False
+        try:
+            for idx, row in enumerate(itertools.chain(sample, reader)):
+                ts = _to_datetime(row.get(schema.time_column, "")) if schema.time_column else None
+                if group_by:
+                    key = _group_key(row, schema, group_by, ts)
+                else:
+                    start = idx // FALLBACK_GROUP_ROWS * FALLBACK_GROUP_ROWS + 1
+                    key = (f"{start}-{start + FALLBACK_GROUP_ROWS - 1}",)
+                stats = groups.get(key)
+                if stats is None:
+                    stats = groups[key] = _GroupStats()
+                    if len(groups) > MAX_OPEN_GROUPS:
+                        old_key, old_stats = groups.popitem(last=False)
+                        yield _summary_document(old_key, group_by or ["rows"], old_stats, schema, source, table)
+                stats.update(row, schema, ts)
+                if sink is not None:
+                    sink.write(row, ts)
+
+            if sink is not None:
+                sink.close()
+            committed = True
+        finally:
+            # A parse error or a consumer that stops early (failed embed) must
+            # not leave a half-written file / open connection behind
+            if sink is not None and not committed:
+                sink.abort()
+        for key, stats in groups.items():
+            yield _summary_document(key, group_by or ["rows"], stats, schema, source, table)
+
+def has_numeric_columns(path: str) -> bool:
+    """Return True if the CSV looks like a numeric export worth aggregating."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        sample = list(itertools.islice(reader, SCHEMA_SAMPLE_ROWS))
+        return bool(infer_schema(reader.fieldnames or [], sample).numeric)
+
+
+# ----------------------- Columnar sinks -----------------------
+
+
+class ColumnarSink:
+    """Buffer rows and write them in batches of COLUMNAR_BATCH_ROWS.
+
+    `close()` publishes the rows, replacing whatever an earlier ingest of the
+    same table stored; `abort()` discards them and keeps the previous rows.
+    """
+
+    def __init__(self, table: str) -> None:
+        self.table = table
+        self.schema: Optional[CsvSchema] = None
+        self._buffer: List[Tuple[Any, ...]] = []
+        self.rows_written = 0
+
+    @property
+    def columns(self) -> List[str]:
+        assert self.schema is not None
+        s = self.schema
+        return s.key_columns + ([s.time_column] if s.time_column else []) + s.numeric
+
+    def open(self, schema: CsvSchema) -> None:
+        self.schema = schema
+
+    def write(self, row: Dict[str, str], ts: Optional[datetime]) -> None:
+        s = self.schema
+        assert s is not None
+        values: List[Any] = [row.get(c, "") for c in s.key_columns]
+        if s.time_column:
+            values.append(ts)
+        values.extend(_to_float(row.get(c, "")) for c in s.numeric)
+        self._buffer.append(tuple(values))
+        if len(self._buffer) >= COLUMNAR_BATCH_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._write_batch(self._buffer)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+
+    def close(self) -> None:
+        self.flush()
+
+    def abort(self) -> None:
+        self._buffer = []
+
+    def _write_batch(self, rows: List[Tuple[Any, ...]]) -> None:  # pragma: no cover – abstract
+        raise NotImplementedError
+
+
+class ParquetSink(ColumnarSink):
+    """Write row groups to `<dest_dir>/<table>.parquet`.
+
+    Rows go to a temporary file that replaces the table file on `close()`.
+    """
+
+    def __init__(self, table: str, dest_dir: Path) -> None:
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("Storing raw CSV rows as Parquet requires pyarrow (pip install pyarrow)")
+        super().__init__(table)
+        self.path = dest_dir / f"{table}.parquet"
+        self._tmp_path = dest_dir / f"{table}.parquet.tmp"
+        self._writer = None
+
+    def open(self, schema: CsvSchema) -> None:
+        super().open(schema)
+        fields = [pa.field(c, pa.string()) for c in schema.key_columns]
+        if schema.time_column:
+            fields.append(pa.field(schema.time_column, pa.timestamp("us", tz="UTC")))
+        fields += [pa.field(c, pa.float64()) for c in schema.numeric]
+        self._arrow_schema = pa.schema(fields)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = pq.ParquetWriter(str(self._tmp_path), self._arrow_schema)
+
+    def _write_batch(self, rows: List[Tuple[Any, ...]]) -> None:
+        cols = list(zip(*rows))
+        arrays = [pa.array(list(col), type=f.type) for col, f in zip(cols, self._arrow_schema)]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._arrow_schema))
+
+    def close(self) -> None:
+        super().close()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._tmp_path.replace(self.path)
+
+    def abort(self) -> None:
+        super().abort()
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            finally:
+                self._writer = None
+                self._tmp_path.unlink(missing_ok=True)
+
+
+class PostgresSink(ColumnarSink):  # pragma: no cover – needs a live database
+    """Bulk-insert rows into a Postgres table the `sql_query` tool can read.
+
+    Rows are loaded into a staging table that is swapped in for the table in
+    one transaction on `close()`, so re-ingesting a CSV replaces its rows.
+    """
+
+    def __init__(self, table: str, conn_str: str) -> None:
+        super().__init__(table)
+        # psycopg2 does not understand the SQLAlchemy driver prefix
+        self.conn_str = conn_str.replace("postgresql+psycopg2://", "postgresql://")
+        self.staging = f"{table}__staging"
+        self._conn = None
+
+    def open(self, schema: CsvSchema) -> None:
+        import psycopg2
+
+        super().open(schema)
+        cols = [f'"{c}" TEXT' for c in schema.key_columns]
+        if schema.time_column:
+            cols.append(f'"{schema.time_column}" TIMESTAMPTZ')
+        cols += [f'"{c}" DOUBLE PRECISION' for c in schema.numeric]
+        self._conn = psycopg2.connect(self.conn_str)
+        with self._conn.cursor() as cur:
+            cur.execute(f'DROP TABLE IF EXISTS "{self.staging}"')
+            cur.execute(f'CREATE TABLE "{self.staging}" ({", ".join(cols)})')
+        self._conn.commit()
+
+    def _write_batch(self, rows: List[Tuple[Any, ...]]) -> None:
+        from psycopg2.extras import execute_values
+
+        col_sql = ", ".join(f'"{c}"' for c in self.columns)
+        with self._conn.cursor() as cur:
+            execute_values(cur, f'INSERT INTO "{self.staging}" ({col_sql}) VALUES %s', rows, page_size=1000)
+        self._conn.commit()
+
+    def close(self) -> None:
+        super().close()
+        if self._conn is None:
+            return
+        try:
+            with self._conn.cursor() as cur:
+                cur.execute(f'DROP TABLE IF EXISTS "{self.table}"')
+                cur.execute(f'ALTER TABLE "{self.staging}" RENAME TO "{self.table}"')
+            self._conn.commit()
+        finally:
+            self._conn.close()
+            self._conn = None
+
+    def abort(self) -> None:
+        super().abort()
+        if self._conn is None:
+            return
+        try:
+            self._conn.rollback()
+            with self._conn.cursor() as cur:
+                cur.execute(f'DROP TABLE IF EXISTS "{self.staging}"')
+            self._conn.commit()
+        finally:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,161 @@
+"""Run the offline benchmarks and compare them against a stored baseline.
+
+Usage (from the repo root):
+    python -m benchmarks.run                                 # all suites
+    python -m benchmarks.run --suites search --search-sizes 10000,100000,1000000
+    python -m benchmarks.run --update-baseline               # accept current numbers
+
+Results are written as JSON (default benchmarks/results.json). A metric
+regresses when it is worse than the baseline by more than --threshold
+(relative) and, for latencies, by more than --min-delta-ms; the process then
+exits with status 1. Only metrics present in both files are compared, so a
+partial run checks just what it measured.
+Baselines are machine-specific: refresh them on the machine that runs CI.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List
+
+HERE = Path(__file__).resolve().parent
+SUITES = ("ingest", "search", "api", "sensors")
+
+
+@dataclass
+class Regression:
+    metric: str
+    baseline: float
+    value: float
+
+    @property
+    def change(self) -> float:
+        return (self.value - self.baseline) / self.baseline
+
+    def __str__(self) -> str:
+        return f"{self.metric}: {self.baseline:.4g} -> {self.value:.4g} ({self.change:+.1%})"
+
+
+def lower_is_better(metric: str) -> bool:
+    return metric.endswith("_ms")
+
+
+def is_compared(metric: str) -> bool:
+    return metric.endswith("_ms") or metric.endswith("_per_sec")
+
+
+def compare(
+    results: Dict[str, float],
+    baseline: Dict[str, float],
+    threshold: float,
+    min_delta_ms: float = 0.0,
+) -> List[Regression]:
+    """Metrics in both dicts that are worse than baseline by more than `threshold`.
+
+    Latencies must also be at least `min_delta_ms` slower, so sub-millisecond
+    jitter on fast paths does not fail the run.
+    """
+    regressions = []
+    for metric, base in sorted(baseline.items()):
+        value = results.get(metric)
+        if value is None or not is_compared(metric) or not base:
+            continue
+        if lower_is_better(metric):
+            worse = value > base * (1 + threshold) and value - base >= min_delta_ms
+        else:
+            worse = value < base * (1 - threshold)
+        if worse:
+            regressions.append(Regression(metric, base, value))
+    return regressions
+
+
+def run_suites(args: argparse.Namespace) -> Dict[str, float]:
+    from benchmarks import suites
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    suites.configure_offline(workdir, args.llm_latency_ms)
+    metrics: Dict[str, float] = {}
+    for name in args.suites:
+        print(f"[bench] {name} …", file=sys.stderr)
+        if name == "ingest":
+            metrics.update(suites.bench_ingest(workdir, args.pdf_docs, args.pdf_pages, args.dim))
+        elif name == "search":
+            for size in args.search_sizes:
+                metrics.update(suites.bench_search(size, args.dim, args.search_queries, args.k))
+        elif name == "api":
+            metrics.update(suites.bench_api(workdir, args.requests, args.concurrency, args.dim))
+        elif name == "sensors":
+            metrics.update(suites.bench_sensors(workdir, args.sensor_rows))
+    return metrics
+
+
+def _csv(kind: Any):
+    return lambda value: [kind(v) for v in value.split(",") if v]
+
+
+def _cli() -> int:
+    p = argparse.ArgumentParser(description="Offline benchmarks for the Smart Building backend")
+    p.add_argument("--suites", type=_csv(str), default=list(SUITES), help=f"Comma-separated subset of {','.join(SUITES)}")
+    p.add_argument("--out", type=Path, default=HERE / "results.json")
+    p.add_argument("--baseline", type=Path, default=HERE / "baseline.json")
+    p.add_argument("--threshold", type=float, default=0.3, help="Allowed relative slowdown before failing (0.3 = 30%%)")
+    p.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore latency regressions smaller than this")
+    p.add_argument("--update-baseline", action="store_true", help="Write these results to --baseline instead of comparing")
+    p.add_argument("--dim", type=int, default=256, help="Embedding dimension for FakeEmbeddings")
+    p.add_argument("--pdf-docs", type=int, default=3)
+    p.add_argument("--pdf-pages", type=int, default=20)
+    p.add_argument("--search-sizes", type=_csv(int), default=[10_000, 100_000], help="Index sizes, e.g. 10000,100000,1000000")
+    p.add_argument("--search-queries", type=int, default=200)
+    p.add_argument("--k", type=int, default=4)
+    p.add_argument("--requests", type=int, default=200, help="Requests per endpoint in the API load test")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--llm-latency-ms", type=float, default=50.0, help="Stub LLM delay per call")
+    p.add_argument("--sensor-rows", type=int, default=20_000)
+    args = p.parse_args()
+
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        p.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    metrics = run_suites(args)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "update_baseline")},
+        },
+        "metrics": metrics,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2, default=str))
+    for metric, value in sorted(metrics.items()):
+        print(f"{metric:48s} {value:12.3f}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2, default=str))
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())["metrics"]
+    regressions = compare(metrics, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for r in regressions:
+            print(f"  {r}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_cli())
@@ -0,0 +1,285 @@
+"""Benchmark suites. Each returns a dict of metric name -> value.
+
+Everything runs offline: `FakeEmbeddings` replace OpenAI embeddings, the
+`stub` LLM backend answers with a fixed delay (LLM_STUB_LATENCY_MS) and a
+SQLite connection stands in for Postgres in the sensor-history loader.
+Metric names ending in `_ms` are latencies (lower is better); names ending
+in `_per_sec` are throughputs (higher is better).
+
+`configure_offline()` must run before any `backend` module is imported.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import importlib.util
+import math
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Iterator, List, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+
+EQUIPMENT = [f"{kind}-{n:02d}" for kind in ("HVAC", "CHILLER", "AHU", "VAV", "PUMP") for n in range(1, 11)]
+
+QUESTIONS = [
+    "What is the vibration threshold for HVAC-01?",
+    "How often should the filters be replaced?",
+    "What chilled-water supply temperature saves energy off-peak?",
+    "When should the AHU ramp to 100% outdoor air?",
+    "What is the target Energy Use Intensity?",
+    "How often are fire dampers inspected?",
+    "What indoor humidity range should be maintained?",
+    "When is economy mode enabled?",
+]
+
+
+def configure_offline(workdir: Path, llm_latency_ms: float) -> None:
+    """Point the backend at `workdir` and at offline embeddings / LLM."""
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["LLM_STUB_LATENCY_MS"] = str(llm_latency_ms)
+    os.environ["USE_PGVECTOR"] = "false"
+
+    from backend.rag import manager
+
+    manager.DATA_DIR = workdir
+    manager.INDEX_PATH = workdir / "faiss_index"
+    manager.SHARDS_DIR = workdir / "shards"
+    manager.TABLES_DIR = workdir / "tables"
+
+
+def _assistant(dim: int) -> Any:
+    from langchain_community.embeddings import FakeEmbeddings
+
+    from backend.rag.manager import DocumentAssistant
+
+    assistant = DocumentAssistant()
+    assistant.embeddings = FakeEmbeddings(size=dim)
+    return assistant
+
+
+def _load_script(name: str) -> ModuleType:
+    # scripts/ is not a package; load the file directly
+    spec = importlib.util.spec_from_file_location(f"_bench_{name}", ROOT / "scripts" / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def _latency_metrics(prefix: str, seconds: Sequence[float]) -> Dict[str, float]:
+    ms = [s * 1000 for s in seconds]
+    return {f"{prefix}.p50_ms": percentile(ms, 50), f"{prefix}.p99_ms": percentile(ms, 99)}
+
+
+# ---------------- Ingest ----------------
+
+
+def make_synthetic_pdf(path: Path, pages: int, seed: int = 0) -> Path:
+    """Multi-page manual built from the dummy-doc paragraphs plus equipment tags."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    paragraphs = [p for paras in _load_script("create_dummy_docs").DOCS.values() for p in paras]
+    lines = [line for p in paragraphs for line in p.split("\n") if line.strip()]
+    rng = random.Random(seed)
+    c = canvas.Canvas(str(path), pagesize=letter)
+    _, height = letter
+    for page in range(pages):
+        text = c.beginText(40, height - 40)
+        text.setFont("Helvetica", 10)
+        for i in range(50):
+            text.textLine(f"{rng.choice(EQUIPMENT)} p{page + 1}.{i + 1}: {rng.choice(lines)}"[:110])
+        c.drawText(text)
+        c.showPage()
+    c.save()
+    return path
+
+
+def bench_ingest(workdir: Path, docs: int, pages: int, dim: int) -> Dict[str, float]:
+    pdf_dir = workdir / "pdfs"
+    pdf_dir.mkdir(parents=True, exist_ok=True)
+    pdfs = [make_synthetic_pdf(pdf_dir / f"manual_{i}.pdf", pages, seed=i) for i in range(docs)]
+    assistant = _assistant(dim)
+
+    started = time.perf_counter()
+    chunks = sum(assistant.ingest_pdf(str(p), shard="bench_ingest") for p in pdfs)
+    elapsed = time.perf_counter() - started
+    return {
+        "ingest.pages_per_sec": docs * pages / elapsed,
+        "ingest.chunks_per_sec": chunks / elapsed,
+    }
+
+
+# ---------------- Search ----------------
+
+
+def _synthetic_chunks(n: int, seed: int) -> Iterator[Any]:
+    from langchain_core.documents import Document
+
+    from backend.rag.metadata import enrich_metadata
+
+    rng = random.Random(seed)
+    for i in range(n):
+        text = f"{rng.choice(EQUIPMENT)} synthetic maintenance note {i}"
+        metadata: Dict[str, Any] = {"page": i % 400}
+        enrich_metadata(metadata, text, f"manual_{i % 200}.pdf", "pdf", None)
+        yield Document(page_content=text, metadata=metadata)
+
+
+def bench_search(size: int, dim: int, queries: int, k: int) -> Dict[str, float]:
+    from backend.rag.manager import _batched
+
+    assistant = _assistant(dim)
+    started = time.perf_counter()
+    for batch in _batched(_synthetic_chunks(size, seed=size), 10_000):
+        assistant._add_documents(batch, "bench_search")
+    build = time.perf_counter() - started
+
+    rng = random.Random(0)
+    plain: List[float] = []
+    filtered: List[float] = []
+    for i in range(queries):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        t0 = time.perf_counter()
+        assistant.similarity_search_docs(question, k=k, shards="bench_search")
+        plain.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        assistant.similarity_search_docs(question, k=k, filters={"equipment": rng.choice(EQUIPMENT)}, shards="bench_search")
+        filtered.append(time.perf_counter() - t0)
+
+    label = f"search.{size}"
+    return {
+        f"{label}.index_vectors_per_sec": size / build,
+        **_latency_metrics(label, plain),
+        **_latency_metrics(f"{label}.filtered", filtered),
+    }
+
+
+# ---------------- API under load ----------------
+
+
+async def _load(client: Any, requests: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(req: Dict[str, Any]) -> None:
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            resp = await client.request(**req)
+            elapsed = time.perf_counter() - t0
+        if resp.status_code == 200:
+            latencies.append(elapsed)
+        else:
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(r) for r in requests))
+    return {"latencies": latencies, "errors": errors, "elapsed": time.perf_counter() - started}
+
+
+def bench_api(workdir: Path, requests: int, concurrency: int, dim: int) -> Dict[str, float]:
+    import httpx
+    from langchain_community.embeddings import FakeEmbeddings
+
+    from backend import main
+
+    main.doc_assist.embeddings = FakeEmbeddings(size=dim)
+    pdf = make_synthetic_pdf(workdir / "api_manual.pdf", pages=10)
+    main.doc_assist.ingest_pdf(str(pdf))
+
+    ask = [{"method": "POST", "url": "/ask", "json": {"query": QUESTIONS[i % len(QUESTIONS)]}} for i in range(requests)]
+    health = [{"method": "GET", "url": f"/health/{('HVAC-01', 'CHILLER-02')[i % 2]}"} for i in range(requests)]
+
+    async def run() -> Dict[str, Dict[str, Any]]:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            return {"ask": await _load(client, ask, concurrency), "health": await _load(client, health, concurrency)}
+
+    results: Dict[str, float] = {}
+    for name, run_stats in asyncio.run(run()).items():
+        results.update(_latency_metrics(f"api.{name}", run_stats["latencies"]))
+        results[f"api.{name}.requests_per_sec"] = len(run_stats["latencies"]) / run_stats["elapsed"]
+        results[f"api.{name}.errors"] = run_stats["errors"]
+    return results
+
+
+# ---------------- Sensor history ----------------
+
+
+class _SqliteCursor:
+    def __init__(self, cur: sqlite3.Cursor) -> None:
+        self._cur = cur
+
+    def __enter__(self) -> "_SqliteCursor":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self._cur.close()
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> None:
+        params = [p.isoformat() if isinstance(p, datetime) else p for p in params]
+        self._cur.execute(sql.replace("%s", "?"), params)
+
+
+class SqliteStandIn:
+    """psycopg2-shaped connection over SQLite, for `load_sensor_history.load_csv`."""
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path)
+
+    def cursor(self) -> _SqliteCursor:
+        return _SqliteCursor(self._conn.cursor())
+
+    def __enter__(self) -> "SqliteStandIn":
+        return self
+
+    def __exit__(self, exc_type: Any, *_: Any) -> None:
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        self._conn.close()
+
+
+def write_sensor_csv(path: Path, rows: int, seed: int = 0) -> Path:
+    rng = random.Random(seed)
+    start = datetime(2025, 7, 1)
+    with path.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "equipment_id", "temperature", "vibration", "pressure"])
+        for i in range(rows):
+            writer.writerow([
+                (start + timedelta(minutes=i)).isoformat(),
+                EQUIPMENT[i % len(EQUIPMENT)],
+                round(rng.uniform(40, 90), 2),
+                round(rng.uniform(0, 0.8), 3),
+                round(rng.uniform(10, 25), 2),
+            ])
+    return path
+
+
+def bench_sensors(workdir: Path, rows: int) -> Dict[str, float]:
+    loader = _load_script("load_sensor_history")
+    path = write_sensor_csv(workdir / "sensor_history.csv", rows)
+    db = workdir / "sensor_history.sqlite"
+    db.unlink(missing_ok=True)
+
+    started = time.perf_counter()
+    inserted = loader.load_csv(path, str(db), connect=SqliteStandIn)
+    elapsed = time.perf_counter() - started
+    return {"sensors.rows_per_sec": inserted / elapsed}
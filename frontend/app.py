@@ -80,6 +80,22 @@ with tab_chat:
         if col.button(ex, key=f"ex_btn_{i}"):
             selected_example = ex
 
+    # Answer every example in one round-trip via the batch endpoint
+    if mode == "RAG" and st.button("Ask all examples", key="ex_batch_btn"):
+        with st.spinner("Answering all examples…"):
+            r = requests.post(
+                f"{API_URL}/ask/batch",
+                json={"queries": examples},
+                headers={"Authorization": f"Bearer {API_TOKEN}"},
+                timeout=120,
+            )
+        if r.ok:
+            for item in r.json()["results"]:
+                with st.expander(item["query"]):
+                    st.markdown(item.get("answer") or f"(error) {item.get('error')}")
+        else:
+            st.error(r.text)
+
     if "chat" not in st.session_state:
         st.session_state.chat = []
 
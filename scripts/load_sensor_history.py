@@ -14,6 +14,7 @@ import os
 import sys
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable
 
 import psycopg2
 
@@ -34,8 +35,9 @@ VALUES (%s, %s, %s, %s, %s)
 ON CONFLICT DO NOTHING;
 """
 
-def load_csv(path: Path, conn_str: str) -> int:
-    with psycopg2.connect(conn_str) as conn, conn.cursor() as cur:
+def load_csv(path: Path, conn_str: str, connect: Callable[[str], Any] = psycopg2.connect) -> int:
+    """Insert every row of `path`; `connect` may be any psycopg2-compatible factory."""
+    with connect(conn_str) as conn, conn.cursor() as cur:
         cur.execute(CREATE_TABLE_SQL)
         inserted = 0
         with path.open() as f:
@@ -0,0 +1,31 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import asyncio
+
+import pytest
+
+from backend.admission import AdmissionController, EndpointLimit, Rejected
+
+
+def test_full_queue_sheds_with_429_and_wait_timeout_gives_503():
+    controller = AdmissionController({"ask": EndpointLimit(concurrency=1, max_queue=1, queue_timeout=0.05)})
+    assert controller.endpoint_for("POST", "/ask") == "ask"
+    assert controller.endpoint_for("GET", "/health/HVAC-01") is None
+
+    async def scenario():
+        await controller.acquire("ask")
+        waiter = asyncio.create_task(controller.acquire("ask"))
+        await asyncio.sleep(0)
+        # Slot busy and queue full: rejected immediately
+        with pytest.raises(Rejected) as full:
+            await controller.acquire("ask")
+        assert full.value.status == 429 and full.value.retry_after >= 1
+        # The queued request gives up after queue_timeout
+        with pytest.raises(Rejected) as timed_out:
+            await waiter
+        assert timed_out.value.status == 503
+        controller.release("ask", elapsed=0.01)
+        await controller.acquire("ask")
+
+    asyncio.run(scenario())
@@ -11,6 +11,9 @@ class _Dummy:
     def invoke(self, *_, **__):
         return {"output": "dummy answer"}
 
+    async def ainvoke(self, *args, **kwargs):
+        return self.invoke(*args, **kwargs)
+
 backend._agent_executor = _Dummy()
 
 client = TestClient(backend.app)
@@ -0,0 +1,50 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+from backend import main as backend
+from langchain.schema import Document
+
+
+class EchoLLM:
+    def __init__(self, *_, **__):
+        pass
+
+    def predict(self, prompt: str) -> str:
+        if "boiler" in prompt:
+            raise RuntimeError("upstream timeout")
+        return prompt.rsplit("QUESTION: ", 1)[1].split("\n")[0]
+
+
+def test_ask_batch_keeps_order_and_isolates_errors(monkeypatch):
+    shared = Document(page_content="shared manual chunk", metadata={"source": "m.pdf", "page": 1})
+    calls = []
+
+    def fake_batch(queries, **_):
+        calls.append(list(queries))
+        return [[shared] for _ in queries]
+
+    monkeypatch.setattr(backend, "get_llm", lambda *_, **__: EchoLLM())
+    monkeypatch.setattr(backend.doc_assist, "similarity_search_docs_batch", fake_batch)
+    client = TestClient(backend.app)
+
+    queries = ["How to reset AHU-3?", "hi", "What about the boiler pressure?", "Chiller setpoint for CHILLER-02?"]
+    resp = client.post("/ask/batch", json={"queries": queries})
+
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["query"] for r in results] == queries
+    assert results[0]["answer"] == queries[0]
+    assert results[1]["citations"] == []
+    assert "upstream timeout" in results[2]["error"]
+    assert results[3]["answer"] == queries[3]
+    # One retrieval call for every non-greeting query, sharing a single chunk
+    assert calls == [[queries[0], queries[2], queries[3]]]
+    assert resp.json()["unique_chunks"] == 1
+
+
+def test_non_positive_context_budget_is_rejected():
+    client = TestClient(backend.app)
+    for budget in (0, -5):
+        assert client.post("/ask", json={"query": "How to reset AHU-3?", "max_context_tokens": budget}).status_code == 422
+        assert client.post("/ask/batch", json={"queries": ["How to reset AHU-3?"], "max_context_tokens": budget}).status_code == 422
@@ -0,0 +1,27 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from benchmarks.run import compare
+from benchmarks.suites import _load_script, SqliteStandIn, percentile, write_sensor_csv
+
+
+def test_compare_flags_only_regressions_beyond_threshold():
+    baseline = {"ingest.pages_per_sec": 100.0, "api.ask.p99_ms": 200.0, "search.10000.p50_ms": 0.5, "api.ask.errors": 0}
+    results = {"ingest.pages_per_sec": 60.0, "api.ask.p99_ms": 230.0, "search.10000.p50_ms": 0.9, "api.ask.errors": 3}
+    regressions = compare(results, baseline, threshold=0.3, min_delta_ms=1.0)
+    # Throughput dropped 40%; the latency changes are within threshold or below min_delta_ms
+    assert [r.metric for r in regressions] == ["ingest.pages_per_sec"]
+    assert [r.metric for r in compare(results, baseline, threshold=0.1)] == ["api.ask.p99_ms", "ingest.pages_per_sec", "search.10000.p50_ms"]
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([7.0], 99) == 7.0
+
+
+def test_sensor_loader_runs_against_sqlite_stand_in(tmp_path):
+    loader = _load_script("load_sensor_history")
+    path = write_sensor_csv(tmp_path / "sensors.csv", rows=25)
+    assert loader.load_csv(path, str(tmp_path / "db.sqlite"), connect=SqliteStandIn) == 25
@@ -0,0 +1,25 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from langchain.schema import Document
+
+from backend.rag.context import build_context, count_tokens
+
+PAGE = " ".join(f"Step {i}: inspect damper actuator {i} and log the reading." for i in range(60))
+
+
+def test_overlapping_chunks_are_merged_and_budgeted():
+    meta = {"source": "ahu_manual.pdf", "page": 3}
+    docs = [
+        Document(page_content=PAGE[400:1400], metadata={**meta, "start_index": 400}),
+        Document(page_content=PAGE[0:1000], metadata={**meta, "start_index": 0}),
+        Document(page_content=PAGE[0:1000], metadata={"source": "copy.pdf", "page": 1}),
+    ]
+
+    ctx = build_context(docs, token_budget=10_000)
+    # Two overlapping chunks become one span; the copy is a near-duplicate
+    assert ctx.text == PAGE[0:1400]
+    assert ctx.tokens_saved > 0
+
+    small = build_context(docs, token_budget=100)
+    assert count_tokens(small.text) <= 100
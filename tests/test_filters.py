@@ -0,0 +1,38 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from langchain.schema import Document
+
+from backend.rag import manager
+from backend.rag.metadata import extract_equipment_tags, infer_doc_type
+
+
+def test_filtered_search_only_returns_matching_equipment(tmp_path, monkeypatch):
+    monkeypatch.setattr(manager, "INDEX_PATH", tmp_path / "faiss_index")
+    assistant = manager.DocumentAssistant()
+    docs = [
+        Document(page_content=f"Replace filters on {tag} quarterly.", metadata={})
+        for tag in ["HVAC-01", "CHILLER-02", "AHU-3"] * 5
+    ]
+    assistant._ingest_stream(assistant._tagged(docs, "hvac_manual.pdf", "pdf", "HQ"))
+
+    hits = assistant.similarity_search_docs("filters", k=4, filters={"equipment": "CHILLER-02"})
+
+    assert len(hits) == 4
+    assert all(",CHILLER-02," in d.metadata["equipment"] for d in hits)
+    assert hits[0].metadata["doc_type"] == "manual"
+    # Reloading rebuilds the filter index from the persisted docstore
+    reloaded = manager.DocumentAssistant()
+    assert len(reloaded.similarity_search_docs("x", k=10, filters={"equipment": "AHU-3", "building": "HQ"})) == 5
+
+
+def test_standards_references_are_not_equipment_tags():
+    text = "Per NFPA-72 and ASHRAE-62 (ISO-9001, UTF-8 export), inspect HVAC-01 and AHU-3."
+    assert extract_equipment_tags(text) == ["AHU-3", "HVAC-01"]
+
+
+def test_doc_type_matches_whole_words_of_the_file_name():
+    assert infer_doc_type("fire_damper_inspection_log.pdf", "pdf") == "pdf"
+    assert infer_doc_type("biomass_boiler.pdf", "pdf") == "pdf"
+    assert infer_doc_type("uploads/AHU3_IOMManual.pdf", "pdf") == "manual"
+    assert infer_doc_type("chiller-specs.pdf", "pdf") == "specification"
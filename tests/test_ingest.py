@@ -0,0 +1,43 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import pytest
+from langchain.schema import Document
+
+from backend.rag import manager
+
+
+def test_failed_stream_keeps_completed_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(manager, "INDEX_PATH", tmp_path / "faiss_index")
+    monkeypatch.setattr(manager, "EMBED_BATCH_SIZE", 2)
+    assistant = manager.DocumentAssistant()
+
+    def pages():
+        for i in range(5):
+            yield Document(page_content=f"page {i}", metadata={"page": i})
+        raise IOError("corrupt page")
+
+    with pytest.raises(manager.PartialIngestError) as exc:
+        assistant._ingest_stream(pages())
+
+    # Two full batches were persisted before the failing batch was read
+    assert exc.value.chunks_added == 4
+    reloaded = manager.DocumentAssistant()
+    assert reloaded.vector_store.index.ntotal == 4
+
+
+def test_stream_checkpoints_every_n_batches_and_at_the_end(tmp_path, monkeypatch):
+    monkeypatch.setattr(manager, "INDEX_PATH", tmp_path / "faiss_index")
+    monkeypatch.setattr(manager, "EMBED_BATCH_SIZE", 2)
+    monkeypatch.setattr(manager, "INGEST_CHECKPOINT_BATCHES", 2)
+    assistant = manager.DocumentAssistant()
+    saves = []
+    persist = assistant._persist
+    monkeypatch.setattr(assistant, "_persist", lambda shard: saves.append(assistant.vector_store.index.ntotal) or persist(shard))
+
+    docs = (Document(page_content=f"page {i}", metadata={"page": i}) for i in range(9))
+    assert assistant._ingest_stream(docs) == 9
+
+    # Five batches: checkpoints after the 2nd and 4th, then the final partial one
+    assert saves == [4, 8, 9]
+    assert manager.DocumentAssistant().vector_store.index.ntotal == 9
@@ -0,0 +1,67 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from backend import llm_factory
+
+
+def test_stub_backend_pools_clients_and_coalesces_prompts(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "stub")
+    monkeypatch.setenv("LLM_STUB_LATENCY_MS", "200")
+
+    llm = llm_factory.get_llm("test-model", temperature=0.0)
+    assert llm_factory.get_llm("test-model", temperature=0.0) is llm
+
+    calls = []
+    original = llm.model._reply
+    monkeypatch.setattr(type(llm.model), "_reply", lambda self, msgs: calls.append(1) or original(msgs))
+
+    prompt = "CONTEXT:\nx\n\nQUESTION: How to reset AHU-3?\n\nANSWER:"
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        answers = list(pool.map(llm.predict, [prompt] * 4))
+
+    assert len(set(answers)) == 1 and "How to reset AHU-3?" in answers[0]
+    assert len(calls) == 1
+
+
+def test_transport_caps_in_flight_requests_until_the_body_is_closed():
+    limit = llm_factory._ConcurrencyLimit(2)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def handler(request):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return httpx.Response(200, json={"ok": True})
+
+    client = httpx.Client(transport=llm_factory._LimitedTransport(httpx.MockTransport(handler), limit))
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        codes = list(pool.map(lambda _: client.get("http://llm.local/v1/chat").status_code, range(6)))
+
+    assert codes == [200] * 6 and peak[0] == 2
+    # Every slot was handed back once the responses were read
+    assert limit._sem.acquire(blocking=False) and limit._sem.acquire(blocking=False)
+
+
+def test_agent_chat_model_calls_share_the_cap(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "stub")
+    monkeypatch.setenv("LLM_STUB_LATENCY_MS", "50")
+    monkeypatch.setattr(llm_factory, "_concurrency", llm_factory._ConcurrencyLimit(1))
+    model = llm_factory.get_chat_model("agent-model", temperature=0.1)
+
+    async def burst():
+        return await asyncio.gather(*(model.ainvoke(f"step {i}") for i in range(3)))
+
+    started = time.perf_counter()
+    assert len(asyncio.run(burst())) == 3
+    assert time.perf_counter() - started >= 0.15
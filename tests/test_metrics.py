@@ -0,0 +1,30 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from backend.metrics import record_cache, stage
+
+prometheus_client = pytest.importorskip("prometheus_client")
+
+
+def _sample(name, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_stage_records_latency_even_when_the_stage_fails():
+    before = _sample("pipeline_stage_seconds_count", component="test", stage="boom")
+    with pytest.raises(RuntimeError):
+        with stage("test", "boom"):
+            raise RuntimeError("fail")
+    assert _sample("pipeline_stage_seconds_count", component="test", stage="boom") == before + 1
+
+
+def test_record_cache_counts_hits_and_misses():
+    hits = _sample("cache_requests_total", cache="test", result="hit")
+    misses = _sample("cache_requests_total", cache="test", result="miss")
+    record_cache("test", hit=True)
+    record_cache("test", hit=False)
+    record_cache("test", hit=False)
+    assert _sample("cache_requests_total", cache="test", result="hit") == hits + 1
+    assert _sample("cache_requests_total", cache="test", result="miss") == misses + 2
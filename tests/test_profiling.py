@@ -0,0 +1,84 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import pstats
+import time
+import tracemalloc
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend import profiling
+from backend.profiling import to_thread
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+def _busy_ingest_work():
+    deadline = time.perf_counter() + 0.05
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+def _app(tmp_path):
+    app = FastAPI()
+    controller = profiling.install(app, enabled=True, admin_token="secret", artifacts_dir=tmp_path)
+
+    @app.post("/work")
+    async def work():
+        return {"total": await to_thread(_busy_ingest_work)}
+
+    return app, controller
+
+
+def test_disabled_by_default_mounts_nothing(tmp_path):
+    app = FastAPI()
+    assert profiling.install(app, enabled=False, admin_token="secret", artifacts_dir=tmp_path) is None
+    assert profiling.install(app, enabled=True, admin_token="", artifacts_dir=tmp_path) is None
+    assert TestClient(app).get("/admin/profiling/requests").status_code == 404
+
+
+def test_cprofile_capture_covers_worker_threads_and_is_downloadable(tmp_path):
+    app, _ = _app(tmp_path)
+    client = TestClient(app)
+    assert client.post("/admin/profiling/requests", json={"path": "/work", "count": 2}).status_code == 401
+
+    assert client.post("/admin/profiling/requests", json={"path": "/work", "count": 2}, headers=ADMIN).status_code == 200
+    for _ in range(3):
+        assert client.post("/work").status_code == 200
+
+    last = client.get("/admin/profiling/requests", headers=ADMIN).json()["last"]
+    assert last["requests"] == 2 and last["artifact"].endswith(".prof")
+    resp = client.get(f"/admin/profiling/artifacts/{last['artifact']}", headers=ADMIN)
+    assert resp.status_code == 200
+    (tmp_path / "download.prof").write_bytes(resp.content)
+    stats = pstats.Stats(str(tmp_path / "download.prof"))
+    assert any(func == "_busy_ingest_work" for (_, _, func) in stats.stats)
+    assert client.get("/admin/profiling/artifacts/..%2Fsecret", headers=ADMIN).status_code == 404
+
+
+def test_sampling_capture_writes_collapsed_stacks(tmp_path):
+    app, _ = _app(tmp_path)
+    client = TestClient(app)
+    client.post("/admin/profiling/requests", json={"path": "/work", "count": 1, "mode": "sampling"}, headers=ADMIN)
+    client.post("/work")
+    last = client.get("/admin/profiling/requests", headers=ADMIN).json()["last"]
+    collapsed = (tmp_path / last["artifact"]).read_text()
+    assert "_busy_ingest_work" in collapsed
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())
+
+
+def test_memory_snapshot_diff(tmp_path):
+    app, _ = _app(tmp_path)
+    client = TestClient(app)
+    assert client.post("/admin/profiling/memory/snapshot", headers=ADMIN).status_code == 409
+    assert client.post("/admin/profiling/memory/start", headers=ADMIN).status_code == 200
+    leak = [bytearray(1024) for _ in range(500)]
+    diff = client.post("/admin/profiling/memory/snapshot", headers=ADMIN).json()
+    assert diff["top"] and diff["top"][0]["size_diff_kb"] > 0
+    tracemalloc.Snapshot.load(str(tmp_path / diff["artifacts"][0]))
+    client.post("/admin/profiling/memory/stop", headers=ADMIN)
+    assert not tracemalloc.is_tracing()
+    del leak
@@ -13,7 +13,7 @@ class DummyLLM:
     def predict(self, prompt: str) -> str:
         return "dummy answer"
 
-backend.ChatOpenAI = DummyLLM  # type: ignore
+backend.get_llm = lambda *_, **__: DummyLLM()  # type: ignore
 backend.doc_assist.ingest_pdf = lambda *_: 1  # type: ignore
 
 dummy_doc = Document(page_content="dummy context", metadata={"source": "test.pdf", "page": 1})
@@ -0,0 +1,68 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from backend.rag import manager
+from backend.rag.registry import REGISTRY_FILE
+
+
+def _write(path, rows):
+    path.write_text("note\n" + "\n".join(rows) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def assistant_factory(tmp_path, monkeypatch):
+    monkeypatch.setattr(manager, "INDEX_PATH", tmp_path / "faiss_index")
+    monkeypatch.setattr(manager, "SHARDS_DIR", tmp_path / "shards")
+    return manager.DocumentAssistant
+
+
+def test_identical_files_are_skipped_and_revisions_replace_changed_chunks(tmp_path, assistant_factory):
+    assistant = assistant_factory()
+    v1 = ["HVAC-01 filter replaced", "CHILLER-02 setpoint 44F", "AHU-3 belt inspected"]
+    path = _write(tmp_path / "log.csv", v1)
+
+    assert assistant.ingest_csv(path, source="log.csv") == 3
+    assert assistant.ingest_csv(path, source="uploads/log.csv") == 0
+    assert assistant.vector_store.index.ntotal == 3
+
+    # One row edited, one added: only those two are embedded, the superseded row is deleted
+    _write(tmp_path / "log.csv", ["HVAC-01 filter replaced", "CHILLER-02 setpoint 42F", "AHU-3 belt inspected", "VAV-112 damper stuck"])
+    assert assistant.ingest_csv(path, source="log.csv") == 2
+    assert assistant.vector_store.index.ntotal == 4
+    assert assistant.get_document("log.csv")["chunks"] == 4
+    texts = [d.page_content for d in assistant.similarity_search_docs("setpoint", k=10)]
+    assert any("42F" in t for t in texts) and not any("44F" in t for t in texts)
+    # Filter positions were rebuilt after the delete renumbered FAISS rows
+    hits = assistant.similarity_search_docs("damper", k=10, filters={"equipment": "VAV-112"})
+    assert [d.page_content for d in hits] == ["note: VAV-112 damper stuck"]
+
+    # Registry survives a restart
+    assert assistant_factory().ingest_csv(path, source="log.csv") == 0
+
+
+def test_delete_and_registry_rebuilt_for_legacy_index(tmp_path, assistant_factory):
+    assistant = assistant_factory()
+    path = _write(tmp_path / "log.csv", ["HVAC-01 filter replaced", "CHILLER-02 setpoint 44F"])
+    other = _write(tmp_path / "other.csv", ["PUMP-7 seal leaking"])
+    assistant.ingest_csv(path)
+    assistant.ingest_csv(other)
+
+    # Index written before the registry existed: chunks are registered from metadata
+    (tmp_path / "faiss_index" / REGISTRY_FILE).unlink()
+    legacy = assistant_factory()
+    assert legacy.get_document("log.csv") == {"source": "log.csv", "content_hash": None, "chunks": 2}
+    assert legacy.ingest_csv(path) == 0
+    assert legacy.vector_store.index.ntotal == 3
+
+    assert legacy.delete_document("log.csv") == 2
+    assert [d["source"] for d in legacy.list_documents()] == ["other.csv"]
+    assert [d.page_content for d in legacy.similarity_search_docs("anything", k=5)] == ["note: PUMP-7 seal leaking"]
+    with pytest.raises(KeyError):
+        legacy.delete_document("log.csv")
+
+    legacy.delete_document("other.csv")
+    assert legacy.similarity_search_docs("anything", k=5) == []
+    assert assistant_factory().list_documents() == []
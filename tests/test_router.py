@@ -0,0 +1,34 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+from backend import main as backend
+from backend.agent import tools
+
+
+class _FailingAgent:
+    async def ainvoke(self, *_, **__):
+        raise AssertionError("fast-path question reached the agent")
+
+
+def test_single_tool_questions_skip_the_agent(monkeypatch):
+    monkeypatch.setattr(tools, "_sensor_live_data", lambda eq: {"temperature": 70, "vibration": 0.2})
+    monkeypatch.setattr(backend, "_agent_executor", _FailingAgent())
+    client = TestClient(backend.app)
+
+    resp = client.post("/agent", json={"question": "Predict failure probability for HVAC-01."})
+    assert resp.status_code == 200
+    assert resp.json()["route"] == "fast_path"
+    assert "HVAC-01" in resp.json()["answer"]
+
+    resp = client.post("/agent", json={"question": "latest sensor readings for CHILLER-02"})
+    assert resp.json()["answer"] == "Latest sensor readings for CHILLER-02: temperature 70, vibration 0.2."
+
+
+def test_open_questions_fall_through():
+    router = backend.fast_path
+    assert router.classify("When was the last filter change for HVAC-01?") is None
+    assert router.classify("Compare HVAC-01 and CHILLER-02 energy use") is None
+    assert router.classify("What would cause high vibration on CHILLER-02?") is None
+    assert router.classify("Show me the current work orders for HVAC-01") is None
+    assert router.classify("Should I replace the filter on AHU-3 given the latest readings?") is None
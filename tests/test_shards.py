@@ -0,0 +1,48 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from langchain.schema import Document
+
+from backend.rag import manager
+
+
+def _docs(prefix, n):
+    return [Document(page_content=f"{prefix} chunk {i}", metadata={"source": f"{prefix}.pdf"}) for i in range(n)]
+
+
+def test_fan_out_merges_shards_and_evicts_under_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(manager, "INDEX_PATH", tmp_path / "faiss_index")
+    monkeypatch.setattr(manager, "SHARDS_DIR", tmp_path / "shards")
+    # Budget of 0 MB: only the shard in use may stay resident
+    assistant = manager.DocumentAssistant(memory_budget_mb=0)
+    assistant._ingest_stream(_docs("tower-a", 3), shard="tower-a")
+    assistant._ingest_stream(_docs("tower-b", 3), shard="tower-b")
+
+    assert assistant.loaded_shards()[-1] == "tower-b"
+    assert "tower-a" not in assistant.loaded_shards()
+    assert assistant.list_shards() == ["tower-a", "tower-b"]
+
+    hits = assistant.similarity_search_docs("chunk", k=5, shards="*")
+    assert len(hits) == 5
+    assert {d.metadata["source"] for d in hits} == {"tower-a.pdf", "tower-b.pdf"}
+    assert len(assistant.similarity_search_docs("chunk", k=5, shards=["tower-a"])) == 3
+
+
+def test_shard_with_ingest_in_progress_is_not_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(manager, "INDEX_PATH", tmp_path / "faiss_index")
+    monkeypatch.setattr(manager, "SHARDS_DIR", tmp_path / "shards")
+    monkeypatch.setattr(manager, "EMBED_BATCH_SIZE", 2)
+    monkeypatch.setattr(manager, "INGEST_CHECKPOINT_BATCHES", 100)
+    assistant = manager.DocumentAssistant(memory_budget_mb=0)
+    assistant._ingest_stream(_docs("tower-b", 3), shard="tower-b")
+
+    def stream():
+        docs = _docs("tower-a", 4)
+        yield from docs[:2]
+        # A query on another shard loads it while tower-a holds unsaved chunks
+        assert len(assistant.similarity_search_docs("chunk", k=5, shards="tower-b")) == 3
+        assert "tower-a" in assistant.loaded_shards() and not assistant.evict("tower-a")
+        yield from docs[2:]
+
+    assert assistant._ingest_stream(stream(), shard="tower-a") == 4
+    assert len(manager.DocumentAssistant().similarity_search_docs("chunk", k=10, shards="tower-a")) == 4
@@ -0,0 +1,70 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from backend.rag import tabular
+
+CSV = """timestamp,equipment_id,temperature,vibration
+2025-07-01T00:00:00,HVAC-01,70,0.2
+2025-07-01T01:00:00,HVAC-01,72,0.3
+2025-07-01T01:00:00,CHILLER-02,45,0.1
+2025-07-02T01:00:00,HVAC-01,74,0.25
+"""
+
+
+def test_csv_rows_are_aggregated_per_equipment_day(tmp_path):
+    path = tmp_path / "sensors.csv"
+    path.write_text(CSV)
+
+    docs = list(tabular.iter_summaries(str(path)))
+
+    assert len(docs) == 3
+    hvac_day1 = next(d for d in docs if d.metadata["equipment_id"] == "HVAC-01" and d.metadata["day"] == "2025-07-01")
+    assert hvac_day1.metadata["row_count"] == 2
+    assert "temperature: mean 71" in hvac_day1.page_content
+
+
+class _RecordingSink(tabular.ColumnarSink):
+    def __init__(self):
+        super().__init__("csv_sensors")
+        self.rows, self.events = [], []
+
+    def _write_batch(self, rows):
+        self.rows.extend(rows)
+
+    def close(self):
+        super().close()
+        self.events.append("close")
+
+    def abort(self):
+        super().abort()
+        self.events.append("abort")
+
+
+def test_mixed_naive_and_offset_timestamps_are_normalised_to_utc(tmp_path):
+    path = tmp_path / "sensors.csv"
+    path.write_text(
+        "timestamp,equipment_id,temperature\n"
+        "2025-07-01T10:00:00,HVAC-01,70\n"
+        "2025-07-01T08:00:00-04:00,HVAC-01,72\n"
+        "2025-07-01T09:00:00+00:00,HVAC-01,74\n"
+    )
+    sink = _RecordingSink()
+
+    (doc,) = tabular.iter_summaries(str(path), sink=sink)
+
+    assert "Time range: 2025-07-01T09:00:00+00:00 to 2025-07-01T12:00:00+00:00." in doc.page_content
+    assert sink.events == ["close"] and all(r[1].utcoffset().total_seconds() == 0 for r in sink.rows)
+
+
+def test_sink_is_aborted_when_the_consumer_stops_early(tmp_path, monkeypatch):
+    path = tmp_path / "sensors.csv"
+    path.write_text(CSV)
+    sink = _RecordingSink()
+    # Flush a summary mid-file so the consumer can stop before the sink is closed
+    monkeypatch.setattr(tabular, "MAX_OPEN_GROUPS", 1)
+
+    summaries = tabular.iter_summaries(str(path), sink=sink)
+    next(summaries)
+    summaries.close()
+
+    assert sink.events == ["abort"]
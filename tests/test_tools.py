@@ -0,0 +1,40 @@
+import sys, pathlib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import asyncio
+
+from backend.agent import tools
+
+
+def test_tool_calls_are_memoized_per_run_and_briefly_across_runs(monkeypatch):
+    monkeypatch.setattr(tools, "_shared_cache", {})
+    calls = []
+
+    def readings(equipment_id: str) -> dict:
+        calls.append(equipment_id)
+        return {"temperature": 70}
+
+    per_run = tools._tool(readings, name="per_run", description="test", ttl=0)
+
+    async def step():
+        # Parallel tool calls of one agent step share the run cache
+        return await asyncio.gather(
+            per_run.ainvoke({"equipment_id": "HVAC-01"}),
+            per_run.ainvoke({"equipment_id": "CHILLER-02"}),
+        )
+
+    with tools.tool_run_scope():
+        asyncio.run(step())
+        per_run.invoke({"equipment_id": "HVAC-01"})
+    assert sorted(calls) == ["CHILLER-02", "HVAC-01"]
+
+    # ttl=0: a new run calls the tool again
+    with tools.tool_run_scope():
+        per_run.invoke({"equipment_id": "HVAC-01"})
+    assert len(calls) == 3
+
+    shared = tools._tool(readings, name="shared", description="test", ttl=60)
+    for _ in range(2):
+        with tools.tool_run_scope():
+            shared.invoke({"equipment_id": "AHU-3"})
+    assert calls.count("AHU-3") == 1